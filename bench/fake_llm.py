@@ -0,0 +1,227 @@
+"""本地模拟大模型接口。
+
+实现 OpenAI 兼容的 `/chat/completions`，支持普通、流式（SSE）与 JSON 批量请求，
+按配置的延迟返回固定格式的释义，并按错误率返回 429 或 500 以测量重试开销；
+设置每分钟请求数上限后，超出限额（按每秒 `rpm / 60` 个的滑动窗口计）的请求返回带
+`Retry-After` 的 429，用于测量限速下的持续吞吐。既可在基准测试中以线程方式启动，也可单独运行供命令行手动调试。
+
+用法：python bench/fake_llm.py [--port 端口] [--latency 秒] [--error-rate 比例] [--rpm 次数]
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_meaning(word: str) -> str:
+    """模拟接口为 `word` 生成的原始释义（含待清洗的前缀与空白）。"""
+    return f"  释义：{word}的模拟释义，用于基准测试  \n"
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """模拟接口服务，记录收到的请求数与返回的错误数。"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+        rpm: int | None = None,
+    ) -> None:
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self._window: deque[float] = deque()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def check_limit(self) -> float | None:
+        """按每分钟请求数上限放行请求，超出时返回需要等待的秒数，否则返回 None。"""
+        if not self.rpm:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            while self._window and self._window[0] <= now - 1:
+                self._window.popleft()
+            if len(self._window) < max(1, self.rpm // 60):
+                self._window.append(now)
+                return None
+            self.throttled += 1
+            return self._window[0] + 1 - now
+
+    def pick_error(self) -> int | None:
+        """记录一次请求，按错误率返回要模拟的错误状态码（429 或 500），否则返回 None。"""
+        with self._lock:
+            self.requests += 1
+            if self._rng.random() >= self.error_rate:
+                return None
+            self.errors += 1
+            return self._rng.choice((429, 500))
+
+    def start(self) -> threading.Thread:
+        """在后台线程中运行服务。"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头与响应体分两次写出，需关闭 Nagle 算法以免与客户端的延迟确认叠加
+    disable_nagle_algorithm = True
+    server: FakeLLMServer
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def _send(
+        self, status: int, body: dict, headers: dict[str, str] | None = None
+    ) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, content: str, usage: dict | None) -> None:
+        """以 SSE 分块返回内容，`usage` 不为 None 时在最后附带用量数据块。"""
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+        chunks = [
+            {
+                "index": 0,
+                "delta": {"content": content[i : i + 4]},
+                "finish_reason": None,
+            }
+            for i in range(0, len(content), 4)
+        ]
+        events = [{"choices": [choice]} for choice in chunks]
+        if usage is not None:
+            events.append({"choices": [], "usage": usage})
+        lines = [
+            "data: "
+            + json.dumps(
+                {
+                    "id": "fake",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": "fake",
+                    **event,
+                },
+                ensure_ascii=False,
+            )
+            + "\n\n"
+            for event in events
+        ]
+        for line in [*lines, "data: [DONE]\n\n"]:
+            data = line.encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("content-length", 0))
+        body = json.loads(self.rfile.read(length))
+        wait = self.server.check_limit()
+        if wait is not None:
+            self._send(
+                429,
+                {"error": {"message": "rate limit exceeded"}},
+                {
+                    "retry-after": str(math.ceil(wait)),
+                    "retry-after-ms": str(math.ceil(wait * 1000)),
+                },
+            )
+            return
+        time.sleep(self.server.latency)
+        match self.server.pick_error():
+            case 429:
+                self._send(
+                    429, {"error": {"message": "rate limited"}}, {"retry-after": "0"}
+                )
+                return
+            case 500:
+                self._send(500, {"error": {"message": "internal error"}})
+                return
+
+        user = body["messages"][-1]["content"]
+        if body.get("response_format", {}).get("type") == "json_object":
+            content = json.dumps(
+                {w: fake_meaning(w).strip() for w in json.loads(user)},
+                ensure_ascii=False,
+            )
+        else:
+            content = fake_meaning(user)
+
+        usage = {
+            "prompt_tokens": len(user),
+            "completion_tokens": len(content),
+            "total_tokens": len(user) + len(content),
+        }
+        if body.get("stream"):
+            include_usage = body.get("stream_options", {}).get("include_usage")
+            self._send_stream(content, usage if include_usage else None)
+            return
+        self._send(
+            200,
+            {
+                "id": "fake",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            },
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="本地模拟大模型接口")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="每次请求的延迟（秒）"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回错误的比例")
+    parser.add_argument("--rpm", type=int, help="每分钟请求数上限，默认不限制")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.port, args.latency, args.error_rate, rpm=args.rpm)
+    print(f"Serving on {server.base_url}, press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
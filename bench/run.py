@@ -0,0 +1,294 @@
+"""数据库、渲染与新增流程的基准。
+
+为每个规模（默认 1k、10k、100k 词条，可指定至 1M）在临时目录中生成合成词库，分别测量
+`insert_word`、`query_word`、`query_random`、`query_range` 与 `render_table` 的单次耗时，
+再启动本地模拟接口（见 `fake_llm.py`，可模拟错误率与每分钟请求数上限）端到端运行 `add`。结果以 JSON Lines 输出，
+可保存后通过 `--baseline` 与新结果比较，耗时超出容差时以退出码 1 提示性能回退。
+
+用法：python bench/run.py [--sizes 1000,10000] [-n 次数] [--json] [--baseline 文件]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from fake_llm import FakeLLMServer
+
+from dict import Dict
+from settings import Settings
+from tool import render_table
+
+# 常用汉字区间，用于生成合成词语与词义
+_CHARS = [chr(c) for c in range(0x4E00, 0x9FA6)]
+
+# 结果中的度量字段，其余字段共同标识一项基准
+_METRICS = {
+    "n",
+    "mean_us",
+    "p50_us",
+    "p95_us",
+    "seconds",
+    "words_per_s",
+    "failed",
+    "requests",
+    "errors",
+    "throttled",
+}
+
+
+def _synthetic_entries(
+    count: int, rng: random.Random, exclude: set[str] | None = None
+) -> list[tuple[str, str]]:
+    """生成 `count` 个不重复的 `(词语, 词义)`，词语为 2~4 个汉字，词义为 20~60 个汉字。"""
+    seen = set(exclude or ())
+    entries: list[tuple[str, str]] = []
+    while len(entries) < count:
+        word = "".join(rng.choices(_CHARS, k=rng.randint(2, 4)))
+        if word in seen:
+            continue
+        seen.add(word)
+        entries.append((word, "".join(rng.choices(_CHARS, k=rng.randint(20, 60)))))
+    return entries
+
+
+def _settings(data_dir: str) -> Settings:
+    """构造数据目录指向 `data_dir` 的配置，禁用响应缓存以测量真实的接口往返。"""
+    os.environ["APPDATA"] = data_dir
+    settings = Settings()
+    settings.cache_enabled = False
+    return settings
+
+
+def _measure(fn: Callable[[int], object], n: int) -> dict[str, float]:
+    """运行 `fn(i)` `n` 次，返回单次耗时（微秒）的统计。"""
+    samples: list[float] = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "n": n,
+        "mean_us": round(statistics.mean(samples), 2),
+        "p50_us": round(samples[len(samples) // 2], 2),
+        "p95_us": round(samples[min(len(samples) - 1, len(samples) * 95 // 100)], 2),
+    }
+
+
+def bench_db(size: int, n: int, rng: random.Random) -> Iterator[dict]:
+    """在 `size` 个词条的合成词库上测量数据库操作与表格渲染。"""
+    entries = _synthetic_entries(size, rng)
+    words = [w for w, _ in entries]
+    with tempfile.TemporaryDirectory() as data_dir:
+        d = Dict(_settings(data_dir))
+        try:
+            start = time.perf_counter()
+            for i in range(0, size, 10_000):
+                d.db.insert_words(entries[i : i + 10_000])
+            seconds = time.perf_counter() - start
+            yield {
+                "bench": "build",
+                "size": size,
+                "seconds": round(seconds, 3),
+                "words_per_s": round(size / seconds),
+            }
+
+            extra = _synthetic_entries(n, rng, set(words))
+            yield {
+                "bench": "insert_word",
+                "size": size,
+                **_measure(lambda i: d.db.insert_word(*extra[i]), n),
+            }
+            probes = [rng.choice(words) for _ in range(n)]
+            yield {
+                "bench": "query_word",
+                "size": size,
+                **_measure(lambda i: d.db.query_word(probes[i]), n),
+            }
+            yield {
+                "bench": "query_random",
+                "size": size,
+                "count": 10,
+                **_measure(lambda i: d.db.query_random(10, rng), n),
+            }
+            starts = [rng.randint(1, size) for _ in range(n)]
+            yield {
+                "bench": "query_range",
+                "size": size,
+                "count": 20,
+                **_measure(lambda i: d.db.query_range(starts[i], starts[i] + 19), n),
+            }
+            for rows in (20, 1000):
+                page = d.db.query_range(1, rows)
+                yield {
+                    "bench": "render_table",
+                    "size": size,
+                    "rows": rows,
+                    **_measure(
+                        lambda i, page=page: render_table(page), max(1, n // 10)
+                    ),
+                }
+        finally:
+            d.close_db()
+
+
+def bench_add(
+    count: int,
+    latency: float,
+    error_rate: float,
+    jobs: int,
+    batch_size: int,
+    rng: random.Random,
+    rpm: int | None = None,
+) -> dict:
+    """对本地模拟接口端到端运行 `add`，测量总耗时与吞吐。"""
+    server = FakeLLMServer(
+        latency=latency, error_rate=error_rate, seed=rng.random(), rpm=rpm
+    )
+    server.start()
+    words = [w for w, _ in _synthetic_entries(count, rng)]
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            settings = _settings(data_dir)
+            settings.base_url = server.base_url
+            settings._api_key = "bench"
+            d = Dict(settings)
+            try:
+                start = time.perf_counter()
+                failed = sum(
+                    err is not None for _, err in d.add_words(words, jobs, batch_size)
+                )
+                seconds = time.perf_counter() - start
+            finally:
+                d.close_db()
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {
+        "bench": "add",
+        "words": count,
+        "latency": latency,
+        "error_rate": error_rate,
+        **({"rpm": rpm} if rpm else {}),
+        "jobs": jobs,
+        "batch_size": batch_size,
+        "seconds": round(seconds, 3),
+        "words_per_s": round(count / seconds, 2),
+        "failed": failed,
+        "requests": server.requests,
+        "errors": server.errors,
+        "throttled": server.throttled,
+    }
+
+
+def _key(result: dict) -> tuple:
+    return tuple(sorted((k, v) for k, v in result.items() if k not in _METRICS))
+
+
+def _regressions(
+    results: list[dict], baseline_path: str, tolerance: float
+) -> list[str]:
+    """与基线结果比较，返回耗时超出 `1 + tolerance` 倍的基准描述。"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {_key(r): r for r in map(json.loads, filter(str.strip, f))}
+    found: list[str] = []
+    for result in results:
+        old = baseline.get(_key(result))
+        if old is None:
+            continue
+        metric = "mean_us" if "mean_us" in result else "seconds"
+        if old.get(metric) and result[metric] > old[metric] * (1 + tolerance):
+            name = " ".join(f"{k}={v}" for k, v in _key(result))
+            found.append(f"{name}: {metric} {old[metric]} -> {result[metric]}")
+    return found
+
+
+def _print(result: dict, as_json: bool) -> None:
+    if as_json:
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+        return
+    name = " ".join(f"{k}={v}" for k, v in _key(result))
+    if "mean_us" in result:
+        print(
+            f"{name:<44} mean {result['mean_us']:>10.2f} us"
+            f"  p95 {result['p95_us']:>10.2f} us",
+            flush=True,
+        )
+    else:
+        print(
+            f"{name:<44} {result['seconds']:>8.3f} s"
+            f"  {result['words_per_s']:>10} words/s",
+            flush=True,
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="kgdict 基准测试")
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000",
+        help="合成词库的规模，以逗号分隔（如 1000,1000000）",
+    )
+    parser.add_argument("-n", type=int, default=1000, help="每项操作运行的次数")
+    parser.add_argument("--seed", type=int, default=0, help="生成合成数据的随机种子")
+    parser.add_argument("--add-words", type=int, default=200, help="add 基准的词语数")
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="模拟接口每次请求的延迟（秒）"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="模拟接口返回错误的比例"
+    )
+    parser.add_argument(
+        "--rpm", type=int, help="模拟接口的每分钟请求数上限，默认不限制"
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="add 的并发请求数")
+    parser.add_argument(
+        "-b", "--batch-size", type=int, default=10, help="add 批量基准的每批词语数"
+    )
+    parser.add_argument("--json", action="store_true", help="以 JSON Lines 输出结果")
+    parser.add_argument("--baseline", help="与之比较的基线结果文件（JSON Lines）")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="允许的耗时增幅，默认 0.25"
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results: list[dict] = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        for result in bench_db(size, args.n, rng):
+            results.append(result)
+            _print(result, args.json)
+    if args.add_words > 0:
+        for batch_size in dict.fromkeys((1, args.batch_size)):
+            result = bench_add(
+                args.add_words,
+                args.latency,
+                args.error_rate,
+                args.jobs,
+                batch_size,
+                rng,
+                args.rpm,
+            )
+            results.append(result)
+            _print(result, args.json)
+
+    if args.baseline:
+        regressions = _regressions(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
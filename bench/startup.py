@@ -0,0 +1,120 @@
+"""启动耗时基准。
+
+在临时数据目录中准备一个小词库，以子进程反复运行只读命令并统计墙钟耗时，
+同时测量空解释器与单独导入 `openai` 的耗时作为对照，并确认只读命令没有导入
+`openai`、也不需要设置 API Key。
+
+用法：python bench/startup.py [-n 次数] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+COMMANDS = {
+    "python": ["-c", "pass"],
+    "import openai": ["-c", "import openai"],
+    "kgdict get": [str(SRC / "main.py"), "get", "谋划"],
+    "kgdict pick": [str(SRC / "main.py"), "pick", "3"],
+    "kgdict range": [str(SRC / "main.py"), "range", "1", "10"],
+    "kgdict search": [str(SRC / "main.py"), "search", "筹划"],
+}
+
+_CHECK_LAZY = f"""
+import sys
+sys.path.insert(0, {str(SRC)!r})
+import main
+main.main(["get", "谋划"])
+print("openai" in sys.modules)
+"""
+
+
+def _env(data_dir: str) -> dict[str, str]:
+    """构造不含 API Key 的子进程环境，数据目录指向临时目录。"""
+    env = {
+        k: v
+        for k, v in os.environ.items()
+        if k not in ("DEEPSEEK_API_KEY", "OPENAI_API_KEY", "API_KEY")
+    }
+    env["APPDATA"] = data_dir
+    # 测量直接执行的耗时，不转发给可能正在运行的常驻进程
+    env["KGDICT_NO_DAEMON"] = "1"
+    return env
+
+
+def _prepare(env: dict[str, str]) -> None:
+    """导入少量带词义的词条，避免调用接口。"""
+    rows = "谋划\t筹划；设法。\n" + "".join(f"词{i}\t筹划{i}。\n" for i in range(100))
+    subprocess.run(
+        [sys.executable, str(SRC / "main.py"), "import", "--format", "tsv"],
+        input=rows,
+        text=True,
+        encoding="utf-8",
+        env=env,
+        check=True,
+        capture_output=True,
+    )
+
+
+def _time(args: list[str], env: dict[str, str], n: int) -> list[float]:
+    """运行 `n` 次并返回每次的耗时（毫秒）。"""
+    samples: list[float] = []
+    for _ in range(n):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args], env=env, check=True, capture_output=True
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="kgdict 启动耗时基准")
+    parser.add_argument("-n", type=int, default=10, help="每个命令运行的次数")
+    parser.add_argument("--json", action="store_true", help="以 JSON Lines 输出结果")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = _env(data_dir)
+        _prepare(env)
+
+        lazy = subprocess.run(
+            [sys.executable, "-c", _CHECK_LAZY],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()[-1]
+        if lazy != "False":
+            print("read-only command imported openai", file=sys.stderr)
+            return 1
+
+        for name, cmd in COMMANDS.items():
+            samples = _time(cmd, env, args.n)
+            result = {
+                "bench": f"startup.{name}",
+                "n": args.n,
+                "mean_ms": round(statistics.mean(samples), 2),
+                "min_ms": round(min(samples), 2),
+                "max_ms": round(max(samples), 2),
+            }
+            if args.json:
+                print(json.dumps(result, ensure_ascii=False))
+            else:
+                print(
+                    f"{name:<16} mean {result['mean_ms']:>8.2f} ms"
+                    f"  min {result['min_ms']:>8.2f} ms"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,441 @@
+"""命令执行模块。
+
+`App` 解析命令行参数并调用 `Dict` 执行命令、输出结果，也负责交互模式与常驻进程。
+"""
+
+import itertools
+import logging
+import shlex
+import sys
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+import daemon
+import tracing
+from cli import get_user_input
+from dataio import open_input, open_output, read_entries, write_entries
+from db import WordTable
+from dict import Dict
+from err import (
+    AppError,
+    DictError,
+    ParseUserInputError,
+    UserInterruptError,
+    WriteExportFileError,
+)
+from settings import Settings
+from tool import iter_lines
+
+# 未设置处理器时由 logging 输出到当前的 sys.stderr，常驻进程中随请求的输出返回
+_logger = logging.getLogger("kgdict")
+
+
+class App:
+    def __init__(self, argv: Any | None = None) -> None:
+        start = time.perf_counter()
+        self.user_input = get_user_input(argv)
+        parsed = time.perf_counter()
+        self.settings = Settings()
+        self.profile = self.user_input.profile
+        self.tracer = (
+            tracing.enable(start) if self.profile or self.settings.trace_path else None
+        )
+        if self.tracer:
+            self.tracer.add("parse", start, parsed - start, {})
+        self.dict = Dict(self.settings)
+        # 常驻进程中用于唤醒后台生成队列的事件
+        self.queue_wake: threading.Event | None = None
+
+    def run(self) -> None:
+        with tracing.span("run", op=self.user_input.op):
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        match self.user_input.op:
+            case "add":
+                self._run_add()
+            case "del":
+                self._run_del()
+            case "set":
+                self._run_set()
+            case "get":
+                self._run_get()
+            case "pick":
+                self._run_pick()
+            case "mark":
+                self._run_mark()
+            case "range":
+                self._run_range()
+            case "import":
+                self._run_import()
+            case "export":
+                self._run_export()
+            case "compile":
+                self._run_compile()
+            case "search":
+                self._run_search()
+            case "cache":
+                self._run_cache()
+            case "worker":
+                self._run_worker()
+            case "regen":
+                self._run_regen()
+            case "sync":
+                self._run_sync()
+            case "shell":
+                self._run_shell()
+            case "serve":
+                self._run_serve()
+
+    def _report_adds(self, results: Iterable[tuple[str, AppError | None]]) -> int:
+        """逐个输出新增结果，返回失败的词语数。"""
+        failed = 0
+        for w, err in results:
+            if err:
+                failed += 1
+                print(f"Add {w} fail: {err}", file=sys.stderr)
+            else:
+                print(f"Add {w} success.")
+        return failed
+
+    def _stream_adds(self, words: list[str]) -> Iterator[tuple[str, AppError | None]]:
+        """逐个新增词语，释义生成时实时输出。"""
+        for w in dict.fromkeys(words):
+            started = False
+
+            def on_text(text: str, w: str = w) -> None:
+                nonlocal started
+                if not started:
+                    started = True
+                    print(f"{w}：", end="")
+                print(text, end="", flush=True)
+
+            try:
+                self.dict.add_word(w, on_text)
+            except AppError as e:
+                if started:
+                    print()
+                if isinstance(e, UserInterruptError):
+                    raise
+                yield w, e
+            else:
+                print()
+                yield w, None
+
+    def _print_rows(self, rows: Iterable[WordTable], stream: bool = False) -> None:
+        """按输出格式逐行打印词条，没有词条时提示无结果。"""
+        printed = False
+        with tracing.span("render", format=self.user_input.output):
+            for line in iter_lines(rows, self.user_input.output, stream):
+                printed = True
+                sys.stdout.write(line + "\n")
+        if not printed:
+            # 表格以外的格式通常用于管道，提示信息输出到 stderr
+            out = sys.stdout if self.user_input.output == "table" else sys.stderr
+            print("No result.", file=out)
+
+    def _run_add(self) -> None:
+        args = self.user_input.add
+        if args.defer:
+            self._run_defer(args.words)
+            return
+        if args.stream:
+            failed = self._report_adds(self._stream_adds(args.words))
+        else:
+            failed = self._report_adds(
+                self.dict.add_words(args.words, args.jobs, args.batch_size)
+            )
+        if failed:
+            raise DictError(f"{failed} word(s) failed to add")
+
+    def _run_defer(self, words: list[str]) -> None:
+        failed = 0
+        for w, err in self.dict.defer_words(words):
+            if err:
+                failed += 1
+                print(f"Add {w} fail: {err}", file=sys.stderr)
+            else:
+                print(f"Queue {w} success.")
+        if self.queue_wake:
+            self.queue_wake.set()
+        elif failed < len(set(words)):
+            print('Run "kgdict worker" to generate meanings.')
+        if failed:
+            raise DictError(f"{failed} word(s) failed to add")
+
+    def _run_worker(self) -> None:
+        args = self.user_input.worker
+        if args.retry_failed:
+            print(f"Retry {self.dict.retry_failed_jobs()} failed words.")
+        if args.status:
+            pending, failed = self.dict.queue_status()
+            print(f"Pending: {pending}, failed: {len(failed)}.")
+            for w, attempts, err in failed:
+                print(f"{w} failed {attempts} times: {err}")
+            return
+        self._drain(args.jobs, args.batch_size, args.watch)
+
+    def _drain(
+        self, jobs: int | None, batch_size: int | None, watch: bool = False
+    ) -> None:
+        """处理生成队列并逐个输出结果，失败的词语留在队列中稍后重试。"""
+        processed = failed = 0
+        for w, err in self.dict.process_queue(jobs, batch_size, watch):
+            processed += 1
+            if err:
+                failed += 1
+                print(f"Generate {w} fail: {err}", file=sys.stderr)
+            else:
+                print(f"Generate {w} success.")
+        print(f"Process {processed} words, {failed} failed.")
+
+    def _run_regen(self) -> None:
+        args = self.user_input.regen
+        queued = self.dict.enqueue_regen(
+            args.min_id,
+            args.max_id,
+            args.before,
+            args.model,
+            args.force,
+            args.include_manual,
+        )
+        print(f"Queue {queued} words for regeneration.")
+        self._drain(args.jobs, args.batch_size)
+
+    def _run_sync(self) -> None:
+        args = self.user_input.sync
+        for source, target, written, deleted in self.dict.sync(
+            args.source, args.target
+        ):
+            print(f"Sync {source} -> {target}: {written} written, {deleted} deleted.")
+
+    def _run_del(self) -> None:
+        for w in self.user_input.delete.words:
+            self.dict.delete_word(w)
+            print(f"Delete {w} success.")
+
+    def _run_set(self) -> None:
+        self.dict.update_word(self.user_input.set.word, self.user_input.set.meaning)
+        print("Set success.")
+
+    def _run_get(self) -> None:
+        word_meanings, missing = self.dict.query_words(self.user_input.get.words)
+        self._print_rows(word_meanings)
+        pending = [r.word for r in word_meanings if not r.meaning]
+        if pending:
+            print(f"Pending: {', '.join(pending)}.", file=sys.stderr)
+        if missing:
+            print(f"Not found: {', '.join(missing)}.", file=sys.stderr)
+
+    def _run_pick(self) -> None:
+        args = self.user_input.pick
+        word_meanings = self.dict.query_random(args.count, args.seed, args.weighted)
+        self._print_rows(word_meanings)
+
+    def _run_mark(self) -> None:
+        args = self.user_input.mark
+        self.dict.mark_words(args.words, args.correct)
+        result = "right" if args.correct else "wrong"
+        for w in dict.fromkeys(args.words):
+            print(f"Mark {w} {result}.")
+
+    def _run_range(self) -> None:
+        args = self.user_input.range
+        if args.next is not None:
+            rows = self.dict.iter_next(args.next)
+        else:
+            rows = self.dict.iter_range(args.start, args.end, args.save)
+        # 只预读 stream_rows + 1 行：未超过时按实际内容计算列宽，超过时以固定列宽逐行输出
+        head = list(itertools.islice(rows, self.settings.stream_rows + 1))
+        self._print_rows(
+            itertools.chain(head, rows), len(head) > self.settings.stream_rows
+        )
+
+    def _run_search(self) -> None:
+        word_meanings = self.dict.search(
+            self.user_input.search.terms, self.user_input.search.limit
+        )
+        self._print_rows(word_meanings)
+
+    def _run_cache(self) -> None:
+        if self.user_input.cache.clear:
+            self.dict.clear_cache()
+            print("Clear cache success.")
+            return
+        stats = self.dict.cache_stats()
+        print(
+            f"Entries: {stats['entries']}, hits: {stats['hits']}, misses: {stats['misses']}."
+        )
+
+    def _run_import(self) -> None:
+        args = self.user_input.import_
+        inserted = skipped = failed = 0
+        with open_input(args.path) as stream:
+            for n_inserted, n_skipped, pending in self.dict.import_words(
+                read_entries(stream, args.fmt), args.chunk_size
+            ):
+                inserted += n_inserted
+                skipped += n_skipped
+                if pending:
+                    n_failed = self._report_adds(
+                        self.dict.add_words(pending, args.jobs, args.batch_size)
+                    )
+                    inserted += len(pending) - n_failed
+                    failed += n_failed
+        print(f"Import {inserted} words, skip {skipped} existing.")
+        if failed:
+            raise DictError(f"{failed} word(s) failed to add")
+
+    def _run_export(self) -> None:
+        args = self.user_input.export
+        rows = self.dict.export_words(args.min_id, args.max_id, args.since)
+        try:
+            with open_output(args.path, args.compress) as stream:
+                count = write_entries(stream, rows, args.fmt)
+        except OSError as e:
+            raise WriteExportFileError(e) from e
+        # 导出到标准输出时提示信息输出到 stderr，避免混入数据
+        out = sys.stderr if args.path == "-" else sys.stdout
+        print(f"Export {count} words.", file=out)
+
+    def _run_compile(self) -> None:
+        count = self.dict.compile_snapshot()
+        print(f"Compile {count} words to {self.settings.snapshot_path}.")
+
+    def _run_line(self, line: str) -> None:
+        """在交互模式中执行一行命令，错误只影响当前行。"""
+        try:
+            argv = ["-h"] if line == "help" else shlex.split(line)
+        except ValueError as e:
+            print(ParseUserInputError(e), file=sys.stderr)
+            return
+        try:
+            user_input = get_user_input(argv)
+            if user_input.op == "shell":
+                raise ParseUserInputError("already in shell")
+            self.user_input = user_input
+            if user_input.profile and not tracing.enabled():
+                # 单行命令带 --profile 时只统计该行
+                tracer = tracing.enable()
+                try:
+                    self.run()
+                finally:
+                    tracing.disable()
+                    print("\n".join(tracer.summary()), file=sys.stderr)
+            else:
+                self.run()
+        except SystemExit:
+            # -h/--version 输出后会请求退出，交互模式下忽略
+            pass
+        except (KeyboardInterrupt, UserInterruptError):
+            print("Interrupted.")
+        except AppError as e:
+            print(e, file=sys.stderr)
+        except Exception:
+            # 意外的错误属于程序缺陷，输出调用栈后继续交互
+            _logger.exception("Internal err")
+
+    def _run_shell(self) -> None:
+        try:
+            import readline
+        except ImportError:
+            readline = None
+        if readline:
+            try:
+                readline.read_history_file(self.settings.history_path)
+            except OSError:
+                pass
+            readline.set_history_length(1000)
+
+        print('Type "help" for commands, "exit" to quit.')
+        try:
+            while True:
+                try:
+                    line = input("kgdict> ").strip()
+                except EOFError:
+                    print()
+                    break
+                except KeyboardInterrupt:
+                    print()
+                    continue
+                if line in ("exit", "quit"):
+                    break
+                if line:
+                    self._run_line(line)
+        finally:
+            if readline:
+                try:
+                    readline.write_history_file(self.settings.history_path)
+                except OSError:
+                    pass
+
+    def _serve_request(self, argv: list[str]) -> int:
+        """在常驻进程中执行一条转发来的命令，返回与直接运行时一致的退出码。"""
+        try:
+            user_input = get_user_input(argv)
+            if user_input.op in ("shell", "serve"):
+                raise ParseUserInputError(f"{user_input.op} cannot run in daemon")
+            self.user_input = user_input
+            self.run()
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else 0
+        except UserInterruptError:
+            print("Exiting...")
+            return 1
+        except AppError as e:
+            print(e, file=sys.stderr)
+            return 2
+        except Exception:
+            # 意外的错误属于程序缺陷，调用栈随输出返回给客户端，常驻进程继续运行
+            _logger.exception("Internal err")
+            return 3
+        return 0
+
+    def _drain_queue(self, wake: threading.Event) -> None:
+        """常驻进程的后台线程：持续处理生成队列，失败记录在队列中而不输出。"""
+        worker = Dict(self.settings)
+        try:
+            while True:
+                try:
+                    for _ in worker.process_queue(watch=True, wake=wake):
+                        pass
+                except AppError:
+                    # 如缺少 API Key，等待下次唤醒或轮询后重试
+                    if wake.wait(self.settings.queue_poll_interval):
+                        wake.clear()
+        finally:
+            worker.close_db()
+
+    def _run_serve(self) -> None:
+        print(f"Serving on {self.settings.socket_path}, press Ctrl+C to stop.")
+        self.queue_wake = threading.Event()
+        threading.Thread(
+            target=self._drain_queue,
+            args=(self.queue_wake,),
+            name="queue-worker",
+            daemon=True,
+        ).start()
+        try:
+            daemon.serve(self.settings.socket_path, self._serve_request)
+        except KeyboardInterrupt as e:
+            raise UserInterruptError from e
+
+    def _report_trace(self, tracer: tracing.Tracer) -> None:
+        """停止记录，按设置输出耗时汇总或写入追踪文件。"""
+        tracing.disable()
+        if self.profile:
+            print("\n".join(tracer.summary()), file=sys.stderr)
+        if self.settings.trace_path:
+            try:
+                tracer.write(self.settings.trace_path, op=self.user_input.op)
+            except OSError as e:
+                print(f"Write trace fail: {e}", file=sys.stderr)
+
+    def close(self) -> None:
+        try:
+            self.dict.close_db()
+        finally:
+            if self.tracer:
+                self._report_trace(self.tracer)
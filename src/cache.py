@@ -0,0 +1,163 @@
+"""接口响应缓存模块。
+
+以独立的 SQLite 文件保存大模型生成并清洗后的释义，键为
+(base_url, model, system_prompt, temperature, word) 的摘要，命中时无需再次请求接口。
+写入过新条目的会话在关闭时淘汰超过最长保存时间或超出最大条数（按最近访问时间）的条目。
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from err import DatabaseError
+
+
+class ResponseCache:
+    """线程安全的释义缓存，并统计命中与未命中次数。"""
+
+    def __init__(self, path: str, max_entries: int, max_age_days: float) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                  key TEXT PRIMARY KEY,
+                  content TEXT NOT NULL,
+                  created_at REAL NOT NULL,
+                  accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_responses_accessed_at
+                ON responses(accessed_at);
+                CREATE INDEX IF NOT EXISTS idx_responses_created_at
+                ON responses(created_at);
+                CREATE TABLE IF NOT EXISTS counters (
+                  name TEXT PRIMARY KEY,
+                  value INTEGER NOT NULL
+                );
+                """
+            )
+        except Exception as e:
+            raise DatabaseError(e) from e
+
+    @staticmethod
+    def make_key(
+        base_url: str, model: str, system_prompt: str, temperature: float, word: str
+    ) -> str:
+        """根据请求参数计算缓存键。"""
+        raw = json.dumps(
+            [base_url, model, system_prompt, temperature, word], ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """读取缓存的释义并刷新访问时间，未命中返回 None。"""
+        try:
+            with self._lock:
+                row = self.conn.execute(
+                    "SELECT content FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                with self.conn:
+                    self.conn.execute(
+                        "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+                return row[0]
+        except Exception as e:
+            raise DatabaseError(e) from e
+
+    def put(self, key: str, content: str) -> None:
+        """写入或覆盖一条缓存。"""
+        try:
+            now = time.time()
+            with self._lock, self.conn:
+                self.conn.execute(
+                    """
+                    INSERT INTO responses(key, content, created_at, accessed_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                      content = excluded.content,
+                      created_at = excluded.created_at,
+                      accessed_at = excluded.accessed_at;
+                    """,
+                    (key, content, now, now),
+                )
+                self._puts += 1
+        except Exception as e:
+            raise DatabaseError(e) from e
+
+    def stats(self) -> dict[str, int]:
+        """返回缓存条数与累计（含本次会话）的命中、未命中次数。"""
+        try:
+            with self._lock:
+                entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+                counters = dict(self.conn.execute("SELECT name, value FROM counters"))
+            return {
+                "entries": entries[0],
+                "hits": counters.get("hits", 0) + self.hits,
+                "misses": counters.get("misses", 0) + self.misses,
+            }
+        except Exception as e:
+            raise DatabaseError(e) from e
+
+    def clear(self) -> None:
+        """清空缓存条目与统计。"""
+        try:
+            with self._lock, self.conn:
+                self.conn.execute("DELETE FROM responses")
+                self.conn.execute("DELETE FROM counters")
+                self.hits = self.misses = 0
+        except Exception as e:
+            raise DatabaseError(e) from e
+
+    def _evict(self) -> None:
+        """淘汰过期条目，并在超出最大条数时删除最久未访问的条目。"""
+        cutoff = time.time() - self.max_age_days * 86400
+        self.conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+        excess = (
+            self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            - self.max_entries
+        )
+        if excess > 0:
+            self.conn.execute(
+                """
+                DELETE FROM responses WHERE key IN (
+                  SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?
+                )
+                """,
+                (excess,),
+            )
+
+    def close(self) -> None:
+        """累加本次会话的统计，必要时淘汰条目，然后关闭连接。"""
+        try:
+            with self._lock:
+                with self.conn:
+                    for name, value in (("hits", self.hits), ("misses", self.misses)):
+                        self.conn.execute(
+                            """
+                            INSERT INTO counters(name, value) VALUES (?, ?)
+                            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;
+                            """,
+                            (name, value),
+                        )
+                    if self._puts:
+                        self._evict()
+                self.hits = self.misses = self._puts = 0
+                self.conn.close()
+        except Exception as e:
+            raise DatabaseError(e) from e
@@ -3,22 +3,39 @@
 提供命令定义与参数校验，将解析结果封装为 `UserInput` 供上层使用。
 
 命令概览：
-- add: 增加一个或多个词语
+- add: 增加一个或多个词语，可只写入词语、由后台生成释义
 - del: 删除一个或多个词语
 - set: 修改指定词语的词义
 - get: 查询一个或多个词语
-- pick: 随机抽取 N 个词语
-- range: 按位置范围查询词语
+- pick: 随机抽取 N 个词语，可按复习记录加权
+- mark: 记录词语的复习结果（答对或答错）
+- range: 按位置范围查询词语，或从上次阅读的位置继续
+- import: 从文件或标准输入批量导入词语
+- export: 将词库导出为 JSON Lines、CSV 或 TSV
+- compile: 编译只读快照，加速 get 与 range 查询
+- search: 在词语与词义中全文检索
+- cache: 查看或清空释义的响应缓存
+- worker: 处理后台生成队列
+- regen: 按条件批量重新生成词义，中断后可继续
+- sync: 与另一个词库双向增量同步
+- shell: 交互模式，在同一会话中逐行执行上述命令
+- serve: 常驻进程，命令行会自动将命令转发给它执行，并在后台处理生成队列
 """
 
 import argparse
+from datetime import UTC, datetime
+from functools import cache
 from typing import Any, NoReturn
 
+from dataio import EXPORT_FORMATS, FORMATS
 from err import ParseUserInputError
+from tool import OUTPUT_FORMATS
 from user_input import UserInput
 
 
 _VERSION = "0.1.3"
+_PAGE_SIZE = 20
+_SEARCH_LIMIT = 20
 
 
 class QuietArgumentParser(argparse.ArgumentParser):
@@ -45,18 +62,64 @@ def _non_empty(text: str) -> str:
     return value
 
 
+def _timestamp(text: str) -> str:
+    """将 ISO 8601 日期或时间解析为数据库使用的 UTC 时间文本。"""
+    try:
+        value = datetime.fromisoformat(text.strip())
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "must be date or time like 2024-01-31 or 2024-01-31T08:00:00"
+        ) from None
+    if value.tzinfo is not None:
+        value = value.astimezone(UTC)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+@cache
 def _build_parser() -> argparse.ArgumentParser:
-    """构建命令行参数解析器。"""
+    """构建命令行参数解析器（同一进程内复用，交互模式下无需逐行重建）。"""
     parser = QuietArgumentParser(
         prog="kgdict",
         description=f"考公词语字典 v{_VERSION}",
         exit_on_error=False,
     )
     parser.add_argument("--version", action="version", version=f"%(prog)s v{_VERSION}")
+    parser.add_argument(
+        "--profile", action="store_true", help="结束时输出各阶段耗时与 token 用量汇总"
+    )
     sub = parser.add_subparsers(dest="command", required=True)
 
+    # 查询类命令共用的输出格式参数
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument(
+        "--format",
+        dest="output",
+        choices=OUTPUT_FORMATS,
+        default="table",
+        help="输出格式（默认 table）",
+    )
+
     p_add = sub.add_parser("add", help="增加: 词语...")
     p_add.add_argument("words", nargs="+", type=_non_empty)
+    p_add.add_argument(
+        "-j", "--jobs", type=_positive_int, default=None, help="并发生成释义的请求数"
+    )
+    p_add.add_argument(
+        "-b",
+        "--batch-size",
+        type=_positive_int,
+        default=None,
+        help="每次请求合并生成的词语数",
+    )
+    add_mode = p_add.add_mutually_exclusive_group()
+    add_mode.add_argument(
+        "--stream", action="store_true", help="逐个生成并实时输出释义（不并发）"
+    )
+    add_mode.add_argument(
+        "--defer",
+        action="store_true",
+        help="立即写入词语并加入生成队列，由 worker 或常驻进程在后台生成释义",
+    )
 
     p_del = sub.add_parser("del", help="删除: 词语...")
     p_del.add_argument("words", nargs="+", type=_non_empty)
@@ -65,19 +128,204 @@ def _build_parser() -> argparse.ArgumentParser:
     p_set.add_argument("word", type=_non_empty)
     p_set.add_argument("meaning", type=_non_empty)
 
-    p_qw = sub.add_parser("get", help="查询: 词语...")
+    p_qw = sub.add_parser("get", parents=[output], help="查询: 词语...")
     p_qw.add_argument("words", nargs="+", type=_non_empty)
 
-    p_qn = sub.add_parser("pick", help="查询: 随机抽取 N 个词语")
+    p_qn = sub.add_parser("pick", parents=[output], help="查询: 随机抽取 N 个词语")
     p_qn.add_argument("n", type=_positive_int)
+    p_qn.add_argument(
+        "--seed", type=int, default=None, help="随机种子，用于复现抽取结果"
+    )
+    p_qn.add_argument(
+        "--weighted",
+        action="store_true",
+        help="按复习记录加权抽取，答错越多的词语越容易被抽中",
+    )
+
+    p_m = sub.add_parser("mark", help="复习: right|wrong 词语..., 记录答对或答错")
+    p_m.add_argument("result", choices=("right", "wrong"))
+    p_m.add_argument("words", nargs="+", type=_non_empty)
+
+    p_r = sub.add_parser(
+        "range",
+        parents=[output],
+        help="阅读: N1 N2, 查询第 N1 个到第 N2 个之间的词语; --next [N], 继续阅读 N 个",
+    )
+    p_r.add_argument("n1", nargs="?", type=_positive_int)
+    p_r.add_argument("n2", nargs="?", type=_positive_int)
+    p_r.add_argument(
+        "--next",
+        nargs="?",
+        type=_positive_int,
+        const=_PAGE_SIZE,
+        metavar="N",
+        help=f"从上次阅读的位置继续查询 N 个词语（默认 {_PAGE_SIZE}）",
+    )
+    p_r.add_argument(
+        "--save",
+        action="store_true",
+        help="将阅读位置移到该范围的末尾，之后可用 --next 继续",
+    )
+
+    p_imp = sub.add_parser("import", help="导入: 从文件或标准输入批量导入词语")
+    p_imp.add_argument(
+        "path", nargs="?", default="-", help="文件路径，缺省或 - 表示标准输入"
+    )
+    p_imp.add_argument("--format", choices=FORMATS, default="auto", help="文件格式")
+    p_imp.add_argument(
+        "--chunk-size", type=_positive_int, default=None, help="每个事务写入的词条数"
+    )
+    p_imp.add_argument(
+        "-j", "--jobs", type=_positive_int, default=None, help="并发生成释义的请求数"
+    )
+    p_imp.add_argument(
+        "-b",
+        "--batch-size",
+        type=_positive_int,
+        default=None,
+        help="每次请求合并生成的词语数",
+    )
+
+    p_exp = sub.add_parser("export", help="导出: 将词库导出为 JSON Lines、CSV 或 TSV")
+    p_exp.add_argument(
+        "-o",
+        "--output",
+        dest="output_path",
+        default="-",
+        help="输出文件路径，缺省或 - 表示标准输出；以 .gz 结尾时自动压缩",
+    )
+    p_exp.add_argument(
+        "--format", choices=EXPORT_FORMATS, default="jsonl", help="导出格式"
+    )
+    p_exp.add_argument("--gzip", action="store_true", help="以 gzip 压缩输出")
+    p_exp.add_argument(
+        "--min-id", type=_positive_int, default=None, help="只导出 id 不小于该值的词语"
+    )
+    p_exp.add_argument(
+        "--max-id", type=_positive_int, default=None, help="只导出 id 不大于该值的词语"
+    )
+    p_exp.add_argument(
+        "--since",
+        type=_timestamp,
+        default=None,
+        help="只导出在该时刻（默认 UTC）之后更新过的词语",
+    )
+
+    sub.add_parser("compile", help="编译: 生成只读快照，加速 get 与 range 查询")
+
+    p_s = sub.add_parser(
+        "search",
+        parents=[output],
+        help="检索: 关键词..., 查询词语或词义包含全部关键词的词语",
+    )
+    p_s.add_argument("terms", nargs="+", type=_non_empty)
+    p_s.add_argument(
+        "-n",
+        "--limit",
+        type=_positive_int,
+        default=_SEARCH_LIMIT,
+        help=f"最多返回的词语数（默认 {_SEARCH_LIMIT}）",
+    )
+
+    p_c = sub.add_parser("cache", help="缓存: 查看释义缓存的统计信息")
+    p_c.add_argument("--clear", action="store_true", help="清空缓存")
+
+    p_w = sub.add_parser("worker", help="队列: 为 add --defer 加入的词语生成释义")
+    p_w.add_argument(
+        "-j", "--jobs", type=_positive_int, default=None, help="并发生成释义的请求数"
+    )
+    p_w.add_argument(
+        "-b",
+        "--batch-size",
+        type=_positive_int,
+        default=None,
+        help="每次请求合并生成的词语数",
+    )
+    p_w.add_argument(
+        "--watch", action="store_true", help="队列处理完后继续等待新的词语"
+    )
+    p_w.add_argument(
+        "--status", action="store_true", help="只查看队列中待处理与失败的词语"
+    )
+    p_w.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="让失败次数已达上限的词语重新进入队列",
+    )
+
+    p_rg = sub.add_parser(
+        "regen", help="重新生成: 按条件批量重新生成词义，中断后再次运行即可继续"
+    )
+    p_rg.add_argument("--all", action="store_true", help="选择全部词语")
+    p_rg.add_argument(
+        "--min-id", type=_positive_int, default=None, help="只选择 id 不小于该值的词语"
+    )
+    p_rg.add_argument(
+        "--max-id", type=_positive_int, default=None, help="只选择 id 不大于该值的词语"
+    )
+    p_rg.add_argument(
+        "--before",
+        type=_timestamp,
+        default=None,
+        help="只选择在该时刻（默认 UTC）之前更新的词语",
+    )
+    p_rg.add_argument("--model", default=None, help="只选择由该模型生成的词语")
+    p_rg.add_argument(
+        "--force",
+        action="store_true",
+        help="包括已由当前模型与提示词生成的词语，并且不读取响应缓存",
+    )
+    p_rg.add_argument(
+        "--include-manual",
+        action="store_true",
+        help="包括手动设置或导入的词语（默认跳过以免覆盖）",
+    )
+    p_rg.add_argument(
+        "-j", "--jobs", type=_positive_int, default=None, help="并发生成释义的请求数"
+    )
+    p_rg.add_argument(
+        "-b",
+        "--batch-size",
+        type=_positive_int,
+        default=None,
+        help="每次请求合并生成的词语数",
+    )
 
-    p_r = sub.add_parser("range", help="阅读: N1 N2, 查询第 N1 个到第 N2 个之间的词语")
-    p_r.add_argument("n1", type=_positive_int)
-    p_r.add_argument("n2", type=_positive_int)
+    p_sy = sub.add_parser(
+        "sync",
+        help="同步: A [B], 双向同步两个词库中上次同步后的修改，只给出 A 时与本地词库同步",
+    )
+    p_sy.add_argument("source", type=_non_empty, help="词库文件路径")
+    p_sy.add_argument(
+        "target", nargs="?", type=_non_empty, default=None, help="词库文件路径"
+    )
+
+    sub.add_parser("shell", help="交互: 在同一会话中逐行执行命令")
+    sub.add_parser("serve", help="常驻: 保持连接常驻，命令行自动转发至此执行")
 
     return parser
 
 
+def _check_range(args: argparse.Namespace) -> None:
+    """range 命令须且只能使用 `N1 N2` 与 `--next` 之一。"""
+    has_bounds = args.n1 is not None and args.n2 is not None
+    if args.next is None and not has_bounds:
+        raise argparse.ArgumentError(None, "range: requires N1 N2 or --next")
+    if args.next is not None and (args.n1 is not None or args.n2 is not None):
+        raise argparse.ArgumentError(None, "range: N1 N2 not allowed with --next")
+    if args.next is not None and args.save:
+        raise argparse.ArgumentError(None, "range: --save not allowed with --next")
+
+
+def _check_regen(args: argparse.Namespace) -> None:
+    """regen 命令须给出筛选条件，或以 `--all` 明确选择全部词语。"""
+    filters = (args.min_id, args.max_id, args.before, args.model)
+    if not args.all and all(f is None for f in filters):
+        raise argparse.ArgumentError(
+            None, "regen: requires --all or --min-id/--max-id/--before/--model"
+        )
+
+
 def get_user_input(argv: Any | None = None) -> UserInput:
     """解析参数并返回 `UserInput`。
 
@@ -86,6 +334,10 @@ def get_user_input(argv: Any | None = None) -> UserInput:
     parser = _build_parser()
     try:
         args = parser.parse_args(argv)
+        if args.command == "range":
+            _check_range(args)
+        elif args.command == "regen":
+            _check_regen(args)
     except argparse.ArgumentError as e:
         raise ParseUserInputError(f"{e}\n\n{parser.format_help()}") from e
     else:
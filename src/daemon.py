@@ -0,0 +1,160 @@
+"""常驻进程模块。
+
+`kgdict serve` 在 Unix 域套接字上常驻，复用同一个数据库连接、接口客户端与缓存；
+命令行在常驻进程运行时自动将命令转发过去，否则直接执行。
+
+协议：每个连接处理一个请求，请求与响应各为一行 UTF-8 编码的 JSON。
+- 请求：`{"argv": [...], "cwd": "...", "env": "..."}`，argv 为命令行参数，cwd 为客户端的
+  工作目录，env 为客户端相关环境变量的摘要（见 `_env_digest`）
+- 响应：`{"code": 退出码, "stdout": "...", "stderr": "..."}`；环境变量与常驻进程不一致时为
+  `{"local": true}`，客户端改为在本地执行
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import signal
+import socket
+import sys
+from collections.abc import Callable
+
+from err import DaemonError
+
+# 客户端连接常驻进程的超时时间（秒），连接建立后等待响应不设超时
+_CONNECT_TIMEOUT = 1.0
+
+# 影响命令执行结果的环境变量（数据目录已体现在套接字路径中）：API Key 决定后台生成
+# 使用的账号，与常驻进程启动时不一致的命令在本地执行
+_ENV_KEYS = ("DEEPSEEK_API_KEY", "OPENAI_API_KEY", "API_KEY")
+
+
+def default_socket_path() -> str:
+    """返回默认的套接字路径（与 `Settings.socket_path` 一致），转发命令时无需导入配置模块。"""
+    data_dir = os.getenv("APPDATA") or os.path.join(os.path.expanduser("~"), ".kgdict")
+    return os.path.join(data_dir, "kgdict.sock")
+
+
+def _env_digest() -> str:
+    """返回 `_ENV_KEYS` 中环境变量的摘要，请求中不携带 API Key 原文。"""
+    values = [os.getenv(k) for k in _ENV_KEYS]
+    return hashlib.sha256(json.dumps(values).encode("utf-8")).hexdigest()
+
+
+def _supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def _is_alive(path: str) -> bool:
+    """检测套接字文件上是否有常驻进程在监听。"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(_CONNECT_TIMEOUT)
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+        return True
+
+
+def _handle_conn(conn: socket.socket, handle: Callable[[list[str]], int]) -> None:
+    """读取一个请求，在捕获输出的情况下执行并写回响应。"""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with conn.makefile("rb") as reader:
+        line = reader.readline()
+    try:
+        request = json.loads(line)
+        argv = [str(a) for a in request["argv"]]
+        cwd = request.get("cwd") or os.getcwd()
+        env = request.get("env")
+    except (ValueError, KeyError, TypeError) as e:
+        code = 2
+        stderr.write(f"{DaemonError(f'bad request: {e}')}\n")
+    else:
+        if env != _env_digest():
+            conn.sendall(b'{"local": true}\n')
+            return
+        try:
+            with (
+                contextlib.redirect_stdout(stdout),
+                contextlib.redirect_stderr(stderr),
+                contextlib.chdir(cwd),
+            ):
+                code = handle(argv)
+        except OSError as e:
+            code = 2
+            stderr.write(f"{DaemonError(e)}\n")
+    response = {"code": code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+    conn.sendall(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+def serve(path: str, handle: Callable[[list[str]], int]) -> None:
+    """在 `path` 上监听并逐个处理请求，直到被中断。
+
+    - `handle` 接收命令行参数并返回退出码，其输出会被捕获后返回给客户端
+    - 请求按到达顺序串行处理，数据库连接只在当前线程中使用
+    """
+    if not _supported():
+        raise DaemonError("unix domain socket is not supported on this platform")
+    if os.path.exists(path):
+        if _is_alive(path):
+            raise DaemonError(f"daemon is already running on '{path}'")
+        os.unlink(path)
+
+    # 收到 SIGTERM 时与 Ctrl+C 一样退出，保证套接字文件被清理
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        os.chmod(path, 0o600)
+        sock.listen()
+    except OSError as e:
+        raise DaemonError(e) from e
+
+    try:
+        while True:
+            conn, _ = sock.accept()
+            with conn:
+                try:
+                    _handle_conn(conn, handle)
+                except OSError:
+                    # 客户端提前断开时丢弃该请求
+                    continue
+    finally:
+        sock.close()
+        with contextlib.suppress(OSError):
+            os.unlink(path)
+
+
+def forward(path: str, argv: list[str]) -> int | None:
+    """将命令转发给常驻进程并输出其结果，返回退出码。
+
+    - 常驻进程未运行或要求在本地执行（环境变量不一致）时返回 None
+    """
+    if not _supported() or not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(_CONNECT_TIMEOUT)
+        try:
+            sock.connect(path)
+        except OSError:
+            return None
+        sock.settimeout(None)
+        request = {"argv": argv, "cwd": os.getcwd(), "env": _env_digest()}
+        try:
+            sock.sendall(
+                json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n"
+            )
+            with sock.makefile("rb") as reader:
+                response = json.loads(reader.readline())
+        except (OSError, ValueError) as e:
+            raise DaemonError(e) from e
+    finally:
+        sock.close()
+
+    if response.get("local"):
+        return None
+    sys.stdout.write(response.get("stdout", ""))
+    sys.stderr.write(response.get("stderr", ""))
+    return int(response.get("code", 0))
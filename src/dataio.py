@@ -0,0 +1,155 @@
+"""数据导入导出模块。
+
+以流的方式逐行读取词条文件，支持三种格式：
+- lines: 每行一个词语，词义由大模型生成
+- tsv: 每行 `词语<TAB>词义`，词义中的制表符、换行与反斜杠以 `\\t`、`\\n`、`\\\\` 转义，
+  之后的列（如导出的时间戳）被忽略
+- jsonl: 每行一个 `{"word": ..., "meaning": ...}` 对象，`meaning` 可省略
+
+auto 格式按行自动识别：以 `{` 开头视为 jsonl，含制表符视为 tsv，否则视为单个词语。
+输出 TSV 时使用 `escape_tsv` 转义，保证导出的内容可以原样导入。
+
+导出时逐行写出 `EXPORT_FIELDS` 中的字段，支持 jsonl、csv（带表头）与 tsv（无表头），
+可选 gzip 压缩。
+"""
+
+import csv
+import gzip
+import io
+import json
+import sys
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import AbstractContextManager, nullcontext
+from typing import TextIO
+
+from err import ParseImportFileError, WriteExportFileError
+
+FORMATS = ("auto", "lines", "tsv", "jsonl")
+
+EXPORT_FORMATS = ("jsonl", "csv", "tsv")
+EXPORT_FIELDS = ("word", "meaning", "created_at", "updated_at")
+
+_TSV_UNESCAPES = {"t": "\t", "n": "\n", "r": "\r", "\\": "\\"}
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def escape_tsv(text: str) -> str:
+    """转义 TSV 字段中的反斜杠、制表符与换行符。"""
+    return text.translate(_TSV_ESCAPES)
+
+
+def unescape_tsv(text: str) -> str:
+    """还原 TSV 字段中的反斜杠转义，未知的转义序列原样保留。"""
+    if "\\" not in text:
+        return text
+    out: list[str] = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\" and i + 1 < len(text) and text[i + 1] in _TSV_UNESCAPES:
+            out.append(_TSV_UNESCAPES[text[i + 1]])
+            i += 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def open_input(path: str) -> AbstractContextManager[TextIO]:
+    """打开待导入的文件，`-` 表示标准输入（不会被关闭）。"""
+    if path == "-":
+        sys.stdin.reconfigure(encoding="utf-8")
+        return nullcontext(sys.stdin)
+    try:
+        return open(path, encoding="utf-8", newline="")
+    except OSError as e:
+        raise ParseImportFileError(e) from e
+
+
+def _parse_line(line: str, fmt: str, lineno: int) -> tuple[str, str | None]:
+    """解析单行，返回 `(词语, 词义)`，未提供词义时词义为 None。"""
+    if fmt == "auto":
+        if line.lstrip().startswith("{"):
+            fmt = "jsonl"
+        elif "\t" in line:
+            fmt = "tsv"
+        else:
+            fmt = "lines"
+
+    match fmt:
+        case "jsonl":
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ParseImportFileError(f"line {lineno}: {e}") from e
+            if not isinstance(obj, dict) or not isinstance(obj.get("word"), str):
+                raise ParseImportFileError(f"line {lineno}: missing str field 'word'")
+            word, meaning = obj["word"], obj.get("meaning")
+            if meaning is not None and not isinstance(meaning, str):
+                raise ParseImportFileError(f"line {lineno}: 'meaning' must be str")
+        case "tsv":
+            word, _, rest = line.partition("\t")
+            meaning = rest.partition("\t")[0]
+            word, meaning = unescape_tsv(word), unescape_tsv(meaning)
+        case _:
+            word, meaning = line, None
+
+    word = word.strip()
+    if word == "":
+        raise ParseImportFileError(f"line {lineno}: word must be non-empty str")
+    meaning = meaning.strip() if meaning else ""
+    return word, meaning or None
+
+
+def read_entries(stream: TextIO, fmt: str = "auto") -> Iterator[tuple[str, str | None]]:
+    """逐行读取词条并生成 `(词语, 词义)`，空行被忽略。"""
+    try:
+        for lineno, line in enumerate(stream, 1):
+            line = line.rstrip("\r\n")
+            if line.strip():
+                yield _parse_line(line, fmt, lineno)
+    except UnicodeDecodeError as e:
+        raise ParseImportFileError(e) from e
+
+
+def open_output(path: str, compress: bool = False) -> AbstractContextManager[TextIO]:
+    """打开导出目标，`-` 表示标准输出（不会被关闭），`compress` 为真时以 gzip 压缩写入。"""
+    try:
+        if path == "-":
+            if compress:
+                # GzipFile 关闭时不会关闭传入的标准输出
+                return io.TextIOWrapper(
+                    gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb"),
+                    encoding="utf-8",
+                    newline="",
+                )
+            sys.stdout.reconfigure(encoding="utf-8")
+            return nullcontext(sys.stdout)
+        if compress:
+            return gzip.open(path, "wt", encoding="utf-8", newline="")
+        return open(path, "w", encoding="utf-8", newline="")
+    except OSError as e:
+        raise WriteExportFileError(e) from e
+
+
+def write_entries(stream: TextIO, rows: Iterable[Sequence[str]], fmt: str) -> int:
+    """按格式逐行写出词条（字段顺序同 `EXPORT_FIELDS`），返回写出的条数。"""
+    count = 0
+    match fmt:
+        case "csv":
+            writer = csv.writer(stream, lineterminator="\n")
+            writer.writerow(EXPORT_FIELDS)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        case "tsv":
+            for row in rows:
+                stream.write("\t".join(map(escape_tsv, row)) + "\n")
+                count += 1
+        case _:
+            for row in rows:
+                stream.write(
+                    json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n"
+                )
+                count += 1
+    return count
@@ -1,9 +1,29 @@
 """数据库访问层 (SQLite)。
 
 定义表模型与对词库的增删改查操作，所有异常统一封装为自定义数据库错误类型。
+
+位置索引：`word_blocks` 按 id 将词条分块（每块 `_BLOCK_SIZE` 个 id），由触发器维护每块
+现存的词条数。按位置定位时先累加块计数找到目标块，再在块内按 id 顺序偏移，代价只与块数
+和块大小有关，与位置本身无关，且删除词条后依然准确。
+
+结构版本：数据库结构记录在 `PRAGMA user_version` 中，启动时只在版本落后时执行
+`_MIGRATIONS` 中尚未执行的迁移。默认以 WAL 模式打开，批量写入期间其他进程仍可并发读取。
+
+增量同步：触发器在 `changes` 中为每个词语记录最近一次修改的序号（自增，不会复用），删除的
+词语在 `tombstones` 中保留删除时间。每个数据库在 `meta` 中按对端的 `database_id` 记录已同步到
+的序号，再次同步时只需按主键读取之后的修改；从对端写入的词条保留对端的更新时间，冲突时以
+更新时间较新的一方为准。
 """
 
+import bisect
+import heapq
+import itertools
+import math
+import random
 import sqlite3
+import uuid
+from collections.abc import Iterator, Mapping, Sequence
+from contextlib import contextmanager
 from pathlib import Path
 
 from err import (
@@ -13,57 +33,410 @@ from err import (
     DatabaseQueryError,
     DatabaseUpdateError,
 )
+from tracing import traced
+
+# 单条语句可绑定的参数上限（兼容旧版 SQLite 的默认值 999）
+_MAX_VARIABLES = 999
+
+# 位置索引中每块覆盖的 id 数
+_BLOCK_SIZE = 1024
+
+# trigram 分词器可以检索的最短关键词长度
+_MIN_FTS_TERM = 3
+
+# 随机抽样时 id 区间内现存词条占比不低于该值才使用拒绝采样
+_MIN_ID_DENSITY = 0.25
+
+# 加权抽取的权重：(1 + 答错次数 × _WRONG_WEIGHT) / (1 + 答对次数)，不低于 _MIN_WEIGHT；
+# 没有复习记录的词条权重为 1
+_WRONG_WEIGHT = 2.0
+_MIN_WEIGHT = 0.1
+
+# 同步的一条修改：(序号, 词语, 词义, 创建时间, 更新时间, 模型, 提示词摘要, 删除时间)
+Change = tuple[
+    int, str, str | None, str | None, str | None, str | None, str | None, str | None
+]
+
+# 数据库结构迁移，第 i 项（从 0 开始）将 `PRAGMA user_version` 从 i 升级到 i + 1。
+# 已发布的迁移不可修改，结构变更只能追加新项；各语句需兼容未记录版本号的旧数据库。
+_MIGRATIONS: tuple[tuple[str, ...], ...] = (
+    # 1: 词表与更新时间触发器
+    (
+        """
+        CREATE TABLE IF NOT EXISTS words (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          word TEXT NOT NULL UNIQUE,
+          meaning TEXT NOT NULL DEFAULT '',
+          created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_updated
+        AFTER UPDATE ON words
+        FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at BEGIN
+          UPDATE words SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END;
+        """,
+    ),
+    # 2: 元数据表与位置索引
+    (
+        """
+        CREATE TABLE IF NOT EXISTS meta (
+          key TEXT PRIMARY KEY,
+          value TEXT NOT NULL
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS word_blocks (
+          block INTEGER PRIMARY KEY,
+          n INTEGER NOT NULL
+        );
+        """,
+        "DELETE FROM word_blocks;",
+        f"""
+        INSERT INTO word_blocks(block, n)
+        SELECT id / {_BLOCK_SIZE}, COUNT(*) FROM words GROUP BY 1;
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_words_block_insert
+        AFTER INSERT ON words
+        FOR EACH ROW BEGIN
+          INSERT INTO word_blocks(block, n) VALUES (NEW.id / {_BLOCK_SIZE}, 1)
+          ON CONFLICT(block) DO UPDATE SET n = n + 1;
+        END;
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_words_block_delete
+        AFTER DELETE ON words
+        FOR EACH ROW BEGIN
+          UPDATE word_blocks SET n = n - 1 WHERE block = OLD.id / {_BLOCK_SIZE};
+        END;
+        """,
+    ),
+    # 3: 全文索引
+    (
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5(
+          word, meaning, content='words', content_rowid='id', tokenize='trigram'
+        );
+        """,
+        "INSERT INTO words_fts(words_fts) VALUES ('rebuild');",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_fts_insert
+        AFTER INSERT ON words
+        FOR EACH ROW BEGIN
+          INSERT INTO words_fts(rowid, word, meaning)
+          VALUES (NEW.id, NEW.word, NEW.meaning);
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_fts_delete
+        AFTER DELETE ON words
+        FOR EACH ROW BEGIN
+          INSERT INTO words_fts(words_fts, rowid, word, meaning)
+          VALUES ('delete', OLD.id, OLD.word, OLD.meaning);
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_fts_update
+        AFTER UPDATE OF word, meaning ON words
+        FOR EACH ROW BEGIN
+          INSERT INTO words_fts(words_fts, rowid, word, meaning)
+          VALUES ('delete', OLD.id, OLD.word, OLD.meaning);
+          INSERT INTO words_fts(rowid, word, meaning)
+          VALUES (NEW.id, NEW.word, NEW.meaning);
+        END;
+        """,
+    ),
+    # 4: 按更新时间筛选的索引
+    ("CREATE INDEX IF NOT EXISTS idx_words_updated_at ON words(updated_at);",),
+    # 5: 词表修改计数，供快照判断是否过期
+    (
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_generation_insert
+        AFTER INSERT ON words
+        FOR EACH ROW BEGIN
+          INSERT INTO meta(key, value) VALUES ('generation', 1)
+          ON CONFLICT(key) DO UPDATE SET value = value + 1;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_generation_delete
+        AFTER DELETE ON words
+        FOR EACH ROW BEGIN
+          INSERT INTO meta(key, value) VALUES ('generation', 1)
+          ON CONFLICT(key) DO UPDATE SET value = value + 1;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_generation_update
+        AFTER UPDATE OF word, meaning ON words
+        FOR EACH ROW BEGIN
+          INSERT INTO meta(key, value) VALUES ('generation', 1)
+          ON CONFLICT(key) DO UPDATE SET value = value + 1;
+        END;
+        """,
+    ),
+    # 6: 后台生成队列，时间为 Unix 时间戳（秒）
+    (
+        """
+        CREATE TABLE IF NOT EXISTS queue (
+          word_id INTEGER PRIMARY KEY,
+          attempts INTEGER NOT NULL DEFAULT 0,
+          next_attempt_at REAL NOT NULL DEFAULT 0,
+          lease_until REAL NOT NULL DEFAULT 0,
+          last_error TEXT
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_queue_next ON queue(next_attempt_at);",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_queue_delete
+        AFTER DELETE ON words
+        FOR EACH ROW BEGIN
+          DELETE FROM queue WHERE word_id = OLD.id;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_queue_update
+        AFTER UPDATE OF meaning ON words
+        FOR EACH ROW WHEN NEW.meaning != '' BEGIN
+          DELETE FROM queue WHERE word_id = NEW.id;
+        END;
+        """,
+    ),
+    # 7: 生成词义所用的模型与提示词摘要，手动设置或导入的词义为 NULL
+    (
+        "ALTER TABLE words ADD COLUMN model TEXT;",
+        "ALTER TABLE words ADD COLUMN prompt_hash TEXT;",
+        "CREATE INDEX IF NOT EXISTS idx_words_model ON words(model);",
+    ),
+    # 8: 复习记录、加权抽取的别名表与复习记录修改计数
+    (
+        """
+        CREATE TABLE IF NOT EXISTS reviews (
+          word_id INTEGER PRIMARY KEY,
+          correct INTEGER NOT NULL DEFAULT 0,
+          wrong INTEGER NOT NULL DEFAULT 0,
+          weight REAL NOT NULL DEFAULT 1,
+          reviewed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS review_alias (
+          slot INTEGER PRIMARY KEY,
+          prob REAL NOT NULL,
+          word_id INTEGER NOT NULL,
+          alias_id INTEGER NOT NULL
+        );
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_reviews_delete
+        AFTER DELETE ON words
+        FOR EACH ROW BEGIN
+          DELETE FROM reviews WHERE word_id = OLD.id;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_reviews_generation_insert
+        AFTER INSERT ON reviews
+        FOR EACH ROW BEGIN
+          INSERT INTO meta(key, value) VALUES ('review_generation', 1)
+          ON CONFLICT(key) DO UPDATE SET value = value + 1;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_reviews_generation_update
+        AFTER UPDATE OF weight ON reviews
+        FOR EACH ROW BEGIN
+          INSERT INTO meta(key, value) VALUES ('review_generation', 1)
+          ON CONFLICT(key) DO UPDATE SET value = value + 1;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_reviews_generation_delete
+        AFTER DELETE ON reviews
+        FOR EACH ROW BEGIN
+          INSERT INTO meta(key, value) VALUES ('review_generation', 1)
+          ON CONFLICT(key) DO UPDATE SET value = value + 1;
+        END;
+        """,
+    ),
+    # 9: 同步用的修改日志与删除记录：每个词语在 changes 中只保留最近一次修改的序号，
+    # 已删除的词语在 tombstones 中记录删除时间；已有词条全部记为待同步
+    (
+        """
+        CREATE TABLE IF NOT EXISTS changes (
+          seq INTEGER PRIMARY KEY AUTOINCREMENT,
+          word TEXT NOT NULL UNIQUE
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS tombstones (
+          word TEXT PRIMARY KEY,
+          deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        "INSERT OR IGNORE INTO changes(word) SELECT word FROM words ORDER BY id;",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_changes_insert
+        AFTER INSERT ON words
+        FOR EACH ROW BEGIN
+          DELETE FROM tombstones WHERE word = NEW.word;
+          INSERT OR REPLACE INTO changes(word) VALUES (NEW.word);
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_changes_update
+        AFTER UPDATE OF meaning ON words
+        FOR EACH ROW BEGIN
+          INSERT OR REPLACE INTO changes(word) VALUES (NEW.word);
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_changes_delete
+        AFTER DELETE ON words
+        FOR EACH ROW BEGIN
+          INSERT OR REPLACE INTO tombstones(word, deleted_at)
+          VALUES (OLD.word, CURRENT_TIMESTAMP);
+          INSERT OR REPLACE INTO changes(word) VALUES (OLD.word);
+        END;
+        """,
+    ),
+    # 10: regen --force 加入的任务，生成时不读取响应缓存
+    ("ALTER TABLE queue ADD COLUMN refresh INTEGER NOT NULL DEFAULT 0;",),
+    # 11: 重建修改日志触发器。外层语句的冲突处理（如 INSERT OR IGNORE）会覆盖触发器内的
+    # OR REPLACE，重新加入已删除的词语时修改序号不变，因此改为先删除再插入
+    (
+        "DROP TRIGGER IF EXISTS trg_words_changes_insert;",
+        "DROP TRIGGER IF EXISTS trg_words_changes_update;",
+        "DROP TRIGGER IF EXISTS trg_words_changes_delete;",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_changes_insert
+        AFTER INSERT ON words
+        FOR EACH ROW BEGIN
+          DELETE FROM tombstones WHERE word = NEW.word;
+          DELETE FROM changes WHERE word = NEW.word;
+          INSERT INTO changes(word) VALUES (NEW.word);
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_changes_update
+        AFTER UPDATE OF meaning ON words
+        FOR EACH ROW BEGIN
+          DELETE FROM changes WHERE word = NEW.word;
+          INSERT INTO changes(word) VALUES (NEW.word);
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_words_changes_delete
+        AFTER DELETE ON words
+        FOR EACH ROW BEGIN
+          DELETE FROM tombstones WHERE word = OLD.word;
+          INSERT INTO tombstones(word, deleted_at) VALUES (OLD.word, CURRENT_TIMESTAMP);
+          DELETE FROM changes WHERE word = OLD.word;
+          INSERT INTO changes(word) VALUES (OLD.word);
+        END;
+        """,
+    ),
+)
+
+
+def _like_pattern(term: str) -> str:
+    """将关键词转义为子串匹配的 LIKE 模式（转义符为反斜杠）。"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _alias_table(weights: Sequence[float]) -> list[tuple[float, int]]:
+    """按权重构建别名表（Vose 算法），第 i 项为 `(保留 i 的概率, 别名下标)`。"""
+    n = len(weights)
+    total = sum(weights)
+    scaled = [w * n / total for w in weights]
+    table = [(1.0, i) for i in range(n)]
+    small = [i for i, p in enumerate(scaled) if p < 1]
+    large = [i for i, p in enumerate(scaled) if p >= 1]
+    while small and large:
+        s, g = small.pop(), large.pop()
+        table[s] = (scaled[s], g)
+        scaled[g] += scaled[s] - 1
+        (small if scaled[g] < 1 else large).append(g)
+    return table
 
 
 class WordTable:
     """词表行模型。"""
 
+    __slots__ = ("meaning", "word")
+
     def __init__(self, word: str, meaning: str) -> None:
         self.word = word
         self.meaning = meaning
 
 
 class DictDataBase:
-    """词典数据库封装，负责连接、建表与 CRUD。"""
+    """词典数据库封装，负责连接、结构迁移与 CRUD。"""
 
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        pragmas: Mapping[str, str | int] | None = None,
+        cached_statements: int = 128,
+    ):
         self.db_path = db_path
+        self.pragmas = dict(pragmas or {})
+        self.cached_statements = cached_statements
         self._connect()
-        self._create_table()
+        self._migrate()
 
     def _connect(self) -> None:
-        """建立到 SQLite 的连接并启用 `Row` 工厂。"""
+        """建立到 SQLite 的连接，启用 `Row` 工厂并应用连接参数（`pragmas`）。
+
+        - `cached_statements` 为连接缓存的预编译语句数，相同 SQL 文本重复执行时不再重新解析
+        - 日志模式等持久参数写入数据库文件，其余参数只对当前连接生效
+        """
         try:
             Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = sqlite3.connect(
+                self.db_path, cached_statements=self.cached_statements
+            )
             self.conn.row_factory = sqlite3.Row
+            for name, value in self.pragmas.items():
+                self.conn.execute(f"PRAGMA {name} = {value}")
         except Exception as e:
             raise DatabaseError(e) from e
 
-    def _create_table(self) -> None:
-        """创建表和触发器（若不存在）。"""
+    def _user_version(self) -> int:
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def _migrate(self) -> None:
+        """将数据库结构升级到最新版本，结构已是最新时只读取一次版本号。
+
+        迁移在写锁（`BEGIN IMMEDIATE`）内重新确认版本后执行，多个进程同时启动时只会执行一次；
+        任一语句失败则整体回滚，版本号保持不变。
+        """
         try:
-            self.conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS words (
-                  id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  word TEXT NOT NULL UNIQUE,
-                  meaning TEXT NOT NULL DEFAULT '',
-                  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-                );
-                """
-            )
-            self.conn.execute(
-                """
-                CREATE TRIGGER IF NOT EXISTS trg_words_updated
-                AFTER UPDATE ON words
-                FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at BEGIN
-                  UPDATE words SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
-                END;
-                """
-            )
-            self.conn.commit()
+            version = self._user_version()
+            if version == len(_MIGRATIONS):
+                return
+            if version > len(_MIGRATIONS):
+                raise DatabaseError(
+                    f"database schema version {version} is newer than supported "
+                    f"version {len(_MIGRATIONS)}"
+                )
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._user_version()
+                for target, statements in enumerate(_MIGRATIONS[version:], version + 1):
+                    for sql in statements:
+                        self.conn.execute(sql)
+                    self.conn.execute(f"PRAGMA user_version = {target}")
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        except DatabaseError:
+            raise
         except Exception as e:
             raise DatabaseError(e) from e
 
@@ -89,15 +462,25 @@ class DictDataBase:
     #         # upsert 统一视为写入错误
     #         raise DatabaseInsertError(str(e))
 
-    def insert_word(self, word: str, meaning: str) -> None:
-        """插入新词。若违反唯一约束或其他错误，抛出 `DatabaseInsertError`。"""
+    @traced("db.insert_word")
+    def insert_word(
+        self,
+        word: str,
+        meaning: str,
+        model: str | None = None,
+        prompt_hash: str | None = None,
+    ) -> None:
+        """插入新词。若违反唯一约束或其他错误，抛出 `DatabaseInsertError`。
+
+        - `model` 与 `prompt_hash` 记录生成词义所用的模型与提示词摘要
+        """
         try:
             self.conn.execute(
                 """
-                INSERT INTO words(word, meaning)
-                VALUES(?, ?);
+                INSERT INTO words(word, meaning, model, prompt_hash)
+                VALUES(?, ?, ?, ?);
                 """,
-                (word, meaning),
+                (word, meaning, model, prompt_hash),
             )
             self.conn.commit()
         except sqlite3.IntegrityError:
@@ -107,6 +490,23 @@ class DictDataBase:
         except Exception as e:
             raise DatabaseInsertError(e) from e
 
+    @traced("db.insert_words")
+    def insert_words(self, entries: Sequence[tuple[str, str]]) -> int:
+        """在单个事务中批量插入词条，已存在的词语被忽略，返回实际插入的条数。"""
+        try:
+            with self.conn:
+                cur = self.conn.executemany(
+                    """
+                    INSERT OR IGNORE INTO words(word, meaning)
+                    VALUES(?, ?);
+                    """,
+                    entries,
+                )
+            return cur.rowcount
+        except Exception as e:
+            raise DatabaseInsertError(e) from e
+
+    @traced("db.delete_word")
     def delete_word(self, word: str) -> None:
         """删除指定词语，若不存在则抛出 `DatabaseDeleteError`。"""
         try:
@@ -119,11 +519,15 @@ class DictDataBase:
         except Exception as e:
             raise DatabaseDeleteError(e) from e
 
+    @traced("db.update_word")
     def update_word(self, word: str, meaning: str) -> None:
-        """更新词义，若目标不存在或约束失败则抛错。"""
+        """更新词义（视为手动设置，清除生成来源），若目标不存在或约束失败则抛错。"""
         try:
             cur = self.conn.execute(
-                "UPDATE words SET meaning = ? WHERE word = ?",
+                """
+                UPDATE words SET meaning = ?, model = NULL, prompt_hash = NULL
+                WHERE word = ?
+                """,
                 (meaning, word),
             )
             if cur.rowcount == 0:
@@ -136,6 +540,7 @@ class DictDataBase:
         except Exception as e:
             raise DatabaseUpdateError(e) from e
 
+    @traced("db.query_word")
     def query_word(self, word: str) -> WordTable | None:
         """按词语精确查询，返回 `WordTable` 或 `None`。"""
         try:
@@ -145,25 +550,886 @@ class DictDataBase:
         except Exception as e:
             raise DatabaseQueryError(e) from e
 
-    def query_random(self, count: int) -> list[WordTable]:
-        """随机返回指定数量的词条。"""
+    def _select_in(
+        self, sql: str, values: Sequence[str | int]
+    ) -> Iterator[sqlite3.Row]:
+        """按参数上限分块执行含 `IN ({placeholders})` 的查询，逐行返回结果。"""
+        for i in range(0, len(values), _MAX_VARIABLES):
+            chunk = values[i : i + _MAX_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            yield from self.conn.execute(sql.format(placeholders=placeholders), chunk)
+
+    @traced("db.existing_words")
+    def existing_words(self, words: Sequence[str]) -> set[str]:
+        """返回 `words` 中已存在于数据库的词语。"""
         try:
-            cur = self.conn.execute(
-                "SELECT * FROM words ORDER BY RANDOM() LIMIT ?", (count,)
+            return {
+                row["word"]
+                for row in self._select_in(
+                    "SELECT word FROM words WHERE word IN ({placeholders})", words
+                )
+            }
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    @traced("db.query_words")
+    def query_words(self, words: Sequence[str]) -> tuple[list[WordTable], list[str]]:
+        """批量精确查询，按调用方顺序返回 `(命中的词条, 缺失的词语)`，重复词语只返回一次。"""
+        try:
+            unique = list(dict.fromkeys(words))
+            found = {
+                row["word"]: WordTable(row["word"], row["meaning"])
+                for row in self._select_in(
+                    "SELECT word, meaning FROM words WHERE word IN ({placeholders})",
+                    unique,
+                )
+            }
+            return (
+                [found[w] for w in unique if w in found],
+                [w for w in unique if w not in found],
             )
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    @traced("db.search")
+    def search(self, terms: Sequence[str], limit: int) -> list[WordTable]:
+        """在词语与词义中检索同时包含全部关键词的词条，按相关度返回至多 `limit` 条。
+
+        - 关键词均不短于 3 个字符时使用 FTS5 trigram 索引，按 bm25 排序（词语列权重更高）
+        - 存在更短的关键词（如两字词）时 trigram 无法使用索引，退化为 LIKE 扫描，
+          词语完全匹配者优先，其次是词语包含关键词者
+        """
+        try:
+            if all(len(t) >= _MIN_FTS_TERM for t in terms):
+                query = " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+                cur = self.conn.execute(
+                    """
+                    SELECT w.word, w.meaning FROM words_fts f
+                    JOIN words w ON w.id = f.rowid
+                    WHERE words_fts MATCH ?
+                    ORDER BY bm25(words_fts, 10.0, 1.0) LIMIT ?
+                    """,
+                    (query, limit),
+                )
+            else:
+                patterns = [_like_pattern(t) for t in terms]
+                where = " AND ".join(
+                    "(word LIKE ? ESCAPE '\\' OR meaning LIKE ? ESCAPE '\\')"
+                    for _ in terms
+                )
+                cur = self.conn.execute(
+                    f"""
+                    SELECT word, meaning FROM words WHERE {where}
+                    ORDER BY word = ? DESC, instr(word, ?) > 0 DESC, id ASC LIMIT ?
+                    """,
+                    (
+                        *(p for p in patterns for _ in range(2)),
+                        terms[0],
+                        terms[0],
+                        limit,
+                    ),
+                )
             return [WordTable(row["word"], row["meaning"]) for row in cur.fetchall()]
         except Exception as e:
             raise DatabaseQueryError(e) from e
 
+    def _sample_ids(self, count: int, rng: random.Random) -> list[int]:
+        """不放回地均匀抽取 `count` 个词条 id，代价与抽取数量成正比。
+
+        - 抽取量超过总数一半时，直接读取全部 id 再抽样
+        - id 区间足够稠密时，在 [最小 id, 最大 id] 内随机生成候选并批量回查，
+          已删除的 id 丢弃重抽（拒绝采样），期望候选数为 `count / 稠密度`
+        - id 区间过于稀疏时，按位置均匀抽样，再通过位置索引定位 id
+        """
+        total = self.conn.execute("SELECT SUM(n) FROM word_blocks").fetchone()[0] or 0
+        if total == 0:
+            return []
+        count = min(count, total)
+        if count * 2 > total:
+            ids = [row[0] for row in self.conn.execute("SELECT id FROM words")]
+            return rng.sample(ids, count)
+
+        lo, hi = self.conn.execute(
+            "SELECT (SELECT MIN(id) FROM words), (SELECT MAX(id) FROM words)"
+        ).fetchone()
+        density = total / (hi - lo + 1)
+        if density >= _MIN_ID_DENSITY:
+            picked: dict[int, None] = {}
+            while len(picked) < count:
+                need = math.ceil((count - len(picked)) / density)
+                candidates = [
+                    c
+                    for c in dict.fromkeys(rng.randint(lo, hi) for _ in range(need))
+                    if c not in picked
+                ]
+                found = {
+                    row[0]
+                    for row in self._select_in(
+                        "SELECT id FROM words WHERE id IN ({placeholders})", candidates
+                    )
+                }
+                for c in candidates:
+                    if c in found and len(picked) < count:
+                        picked[c] = None
+            return list(picked)
+
+        blocks = self.conn.execute(
+            "SELECT block, n FROM word_blocks WHERE n > 0 ORDER BY block"
+        ).fetchall()
+        acc = list(itertools.accumulate(row["n"] for row in blocks))
+        ids: list[int] = []
+        for position in rng.sample(range(1, total + 1), count):
+            i = bisect.bisect_left(acc, position)
+            row = self.conn.execute(
+                "SELECT id FROM words WHERE id >= ? ORDER BY id LIMIT 1 OFFSET ?",
+                (
+                    blocks[i]["block"] * _BLOCK_SIZE,
+                    position - 1 - (acc[i] - blocks[i]["n"]),
+                ),
+            ).fetchone()
+            ids.append(row[0])
+        return ids
+
+    def _build_review_alias(self) -> tuple[list[tuple[float, int, int]], float]:
+        """按当前复习记录构建别名表，返回 `([(保留概率, 词条 id, 别名词条 id)], 额外权重总和)`。
+
+        别名表只包含权重大于 1 的词条，每项的权重为超出 1 的部分，构建代价与这类词条数成正比。
+        """
+        rows = self.conn.execute(
+            "SELECT word_id, weight - 1 FROM reviews WHERE weight > 1"
+        ).fetchall()
+        table = [
+            (prob, rows[slot][0], rows[alias][0])
+            for slot, (prob, alias) in enumerate(_alias_table([row[1] for row in rows]))
+        ]
+        return table, sum(row[1] for row in rows)
+
+    def _store_review_alias(self) -> None:
+        """在调用方的写事务中重建 `review_alias`，并记录其对应的复习记录修改计数。"""
+        table, mass = self._build_review_alias()
+        generation = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'review_generation'"
+        ).fetchone()[0]
+        self.conn.execute("DELETE FROM review_alias")
+        self.conn.executemany(
+            "INSERT INTO review_alias(slot, prob, word_id, alias_id) VALUES (?, ?, ?, ?)",
+            ((slot, *entry) for slot, entry in enumerate(table)),
+        )
+        self.conn.executemany(
+            """
+            INSERT INTO meta(key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value;
+            """,
+            (
+                ("review_alias_generation", generation),
+                ("review_alias_mass", repr(mass)),
+            ),
+        )
+
+    def _review_alias(self) -> tuple[int, float, list[tuple[float, int, int]] | None]:
+        """返回加权抽取别名表的 `(槽数, 额外权重总和, 内存中的别名表)`。
+
+        - 别名表由 `record_reviews` 在同一事务中重建，与复习记录一致时第三项为 None，
+          抽取时按槽读取 `review_alias`
+        - 删除词条等操作使别名表过期时在内存中构建，抽取过程不写入数据库
+        """
+        generation, built, mass = self.conn.execute(
+            """
+            SELECT (SELECT value FROM meta WHERE key = 'review_generation'),
+                   (SELECT value FROM meta WHERE key = 'review_alias_generation'),
+                   (SELECT value FROM meta WHERE key = 'review_alias_mass')
+            """
+        ).fetchone()
+        if generation is None:
+            return 0, 0.0, None
+        if built != generation:
+            table, mass = self._build_review_alias()
+            return len(table), mass, table
+        size = self.conn.execute("SELECT COUNT(*) FROM review_alias").fetchone()[0]
+        return size, float(mass) if size else 0.0, None
+
+    def _sample_weighted_ids(self, count: int, rng: random.Random) -> list[int]:
+        """按复习权重 w 不放回地抽取 `count` 个词条 id，期望代价与抽取数量成正比。
+
+        - 将 w 拆为 `min(w, 1)` 与 `max(w - 1, 0)` 两部分：前者为对全部词条的均匀抽样，
+          抽中后以 `min(w, 1)` 的概率接受（拒绝采样）；后者由别名表按超出部分抽样。
+          两部分按质量（词条数与别名表的额外权重总和）选择，每次抽中的概率与 w 成正比
+        - 重复抽中的词条丢弃重抽
+        - 抽取量超过总数一半时，读取全部权重，按随机键 `u ** (1 / w)` 取最大的 `count` 个
+        """
+        total = self.conn.execute("SELECT SUM(n) FROM word_blocks").fetchone()[0] or 0
+        if total == 0:
+            return []
+        count = min(count, total)
+        if count * 2 > total:
+            rows = self.conn.execute(
+                """
+                SELECT w.id, COALESCE(r.weight, 1) FROM words w
+                LEFT JOIN reviews r ON r.word_id = w.id
+                """
+            ).fetchall()
+            keyed = ((rng.random() ** (1 / weight), id_) for id_, weight in rows)
+            return [id_ for _, id_ in heapq.nlargest(count, keyed)]
+
+        size, mass, alias = self._review_alias()
+        picked: dict[int, None] = {}
+        while len(picked) < count:
+            need = count - len(picked)
+            from_alias = sum(rng.random() * (total + mass) < mass for _ in range(need))
+            candidates: list[int] = []
+            if from_alias:
+                slots = [rng.randrange(size) for _ in range(from_alias)]
+                if alias is not None:
+                    table = {slot: alias[slot] for slot in slots}
+                else:
+                    table = {
+                        row[0]: (row[1], row[2], row[3])
+                        for row in self._select_in(
+                            "SELECT slot, prob, word_id, alias_id FROM review_alias "
+                            "WHERE slot IN ({placeholders})",
+                            list(set(slots)),
+                        )
+                    }
+                for slot in slots:
+                    prob, word_id, alias_id = table[slot]
+                    candidates.append(word_id if rng.random() < prob else alias_id)
+            if need > from_alias:
+                uniform = self._sample_ids(need - from_alias, rng)
+                weights = {
+                    row[0]: row[1]
+                    for row in self._select_in(
+                        "SELECT word_id, weight FROM reviews "
+                        "WHERE weight < 1 AND word_id IN ({placeholders})",
+                        uniform,
+                    )
+                }
+                candidates.extend(
+                    c for c in uniform if rng.random() < weights.get(c, 1.0)
+                )
+            for c in candidates:
+                if c not in picked and len(picked) < count:
+                    picked[c] = None
+        return list(picked)
+
+    @traced("db.query_random")
+    def query_random(
+        self, count: int, rng: random.Random | None = None, weighted: bool = False
+    ) -> list[WordTable]:
+        """随机返回至多 `count` 个不重复的词条，可传入 `rng` 以复现抽样结果。
+
+        - `weighted` 为 True 时按复习权重抽取，答错越多的词条越容易被抽中
+        """
+        return list(self.iter_random(count, rng, weighted))
+
+    def iter_random(
+        self, count: int, rng: random.Random | None = None, weighted: bool = False
+    ) -> Iterator[WordTable]:
+        """`query_random` 的生成器版本，抽样后按参数上限分块读取词条，按抽样顺序逐个返回。"""
+        try:
+            if weighted:
+                # 在同一个读事务快照中读取元数据与别名表，期间其他进程重建别名表不影响本次抽取
+                with self.read_transaction():
+                    ids = self._sample_weighted_ids(count, rng or random.Random())
+            else:
+                ids = self._sample_ids(count, rng or random.Random())
+            cur = self.conn.cursor()
+            cur.row_factory = None
+            for i in range(0, len(ids), _MAX_VARIABLES):
+                chunk = ids[i : i + _MAX_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
+                found = {
+                    id_: (word, meaning)
+                    for id_, word, meaning in cur.execute(
+                        f"SELECT id, word, meaning FROM words WHERE id IN ({placeholders})",
+                        chunk,
+                    )
+                }
+                for id_ in chunk:
+                    yield WordTable(*found[id_])
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    def iter_words(
+        self,
+        min_id: int | None = None,
+        max_id: int | None = None,
+        since: str | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[tuple[str, str, str, str]]:
+        """按 id 升序逐行返回 `(词语, 词义, 创建时间, 更新时间)`。
+
+        - 每次从游标读取 `batch_size` 行，内存占用与词条总数无关
+        - 可按 id 闭区间 [min_id, max_id] 与更新时间（不早于 `since`）筛选
+        - 读取期间使用同一个读事务快照，WAL 模式下不阻塞其他进程写入
+        """
+        conditions: list[str] = []
+        params: list[int | str] = []
+        if min_id is not None:
+            conditions.append("id >= ?")
+            params.append(min_id)
+        if max_id is not None:
+            conditions.append("id <= ?")
+            params.append(max_id)
+        if since is not None:
+            conditions.append("updated_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        try:
+            cur = self.conn.cursor()
+            cur.row_factory = None
+            cur.execute(
+                f"""
+                SELECT word, meaning, created_at, updated_at FROM words {where}
+                ORDER BY id ASC
+                """,
+                params,
+            )
+            while rows := cur.fetchmany(batch_size):
+                yield from rows
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    @traced("db.record_reviews")
+    def record_reviews(self, words: Sequence[str], correct: bool) -> None:
+        """为每个词语记录一次答对或答错并更新其抽取权重。
+
+        - 任一词语不存在时整体不写入，并抛出 `DatabaseUpdateError`
+        - 在同一事务中重建加权抽取的别名表，`pick --weighted` 只需读取
+        """
+        try:
+            with self.conn:
+                for word in words:
+                    row = self.conn.execute(
+                        "SELECT id FROM words WHERE word = ?", (word,)
+                    ).fetchone()
+                    if row is None:
+                        raise DatabaseUpdateError(
+                            f"word '{word}' not found in database"
+                        )
+                    self.conn.execute(
+                        """
+                        INSERT INTO reviews(word_id, correct, wrong) VALUES (?, ?, ?)
+                        ON CONFLICT(word_id) DO UPDATE SET
+                          correct = correct + excluded.correct,
+                          wrong = wrong + excluded.wrong,
+                          reviewed_at = CURRENT_TIMESTAMP;
+                        """,
+                        (row[0], int(correct), int(not correct)),
+                    )
+                    self.conn.execute(
+                        """
+                        UPDATE reviews SET weight = MAX(?, (1 + ? * wrong) / (1.0 + correct))
+                        WHERE word_id = ?
+                        """,
+                        (_MIN_WEIGHT, _WRONG_WEIGHT, row[0]),
+                    )
+                self._store_review_alias()
+        except DatabaseUpdateError:
+            raise
+        except Exception as e:
+            raise DatabaseUpdateError(e) from e
+
+    def generation(self) -> int:
+        """返回词表的修改计数，每次增删改词条时由触发器递增。"""
+        try:
+            row = self.conn.execute(
+                "SELECT value FROM meta WHERE key = 'generation'"
+            ).fetchone()
+            return int(row[0]) if row else 0
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    def count_words(self) -> int:
+        """返回词条总数（由位置索引累加，无需扫描词表）。"""
+        try:
+            return (
+                self.conn.execute("SELECT SUM(n) FROM word_blocks").fetchone()[0] or 0
+            )
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    def checkpoint(self) -> None:
+        """将 WAL 中的内容写回数据库文件并截断 WAL。"""
+        try:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except Exception as e:
+            raise DatabaseError(e) from e
+
+    @contextmanager
+    def read_transaction(self) -> Iterator[None]:
+        """在同一个读事务快照中执行多次查询，期间其他连接的写入不可见。"""
+        try:
+            self.conn.execute("BEGIN")
+        except Exception as e:
+            raise DatabaseError(e) from e
+        try:
+            yield
+        finally:
+            self.conn.rollback()
+
+    def iter_id_words(self, batch_size: int = 1000) -> Iterator[tuple[int, str, str]]:
+        """按 id 升序逐行返回 `(id, 词语, 词义)`。"""
+        try:
+            cur = self.conn.cursor()
+            cur.row_factory = None
+            cur.execute("SELECT id, word, meaning FROM words ORDER BY id ASC")
+            while rows := cur.fetchmany(batch_size):
+                yield from rows
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    def iter_ids_by_word(self, batch_size: int = 1000) -> Iterator[int]:
+        """按词语的字节序（BINARY 排序）逐个返回 id，使用词语的唯一索引而无需排序。"""
+        try:
+            cur = self.conn.cursor()
+            cur.row_factory = None
+            cur.execute("SELECT id FROM words ORDER BY word ASC")
+            while rows := cur.fetchmany(batch_size):
+                for row in rows:
+                    yield row[0]
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    @traced("db.enqueue_words")
+    def enqueue_words(self, words: Sequence[str]) -> set[str]:
+        """在单个事务中写入词义为空的新词并加入生成队列，返回实际加入的词语。"""
+        queued: set[str] = set()
+        try:
+            with self.conn:
+                for word in words:
+                    cur = self.conn.execute(
+                        "INSERT OR IGNORE INTO words(word) VALUES (?)", (word,)
+                    )
+                    if cur.rowcount:
+                        self.conn.execute(
+                            "INSERT INTO queue(word_id) VALUES (?)", (cur.lastrowid,)
+                        )
+                        queued.add(word)
+            return queued
+        except Exception as e:
+            raise DatabaseInsertError(e) from e
+
+    @traced("db.lease_jobs")
+    def lease_jobs(
+        self, count: int, now: float, lease_seconds: float, max_attempts: int
+    ) -> list[tuple[int, str, int, bool]]:
+        """领取至多 `count` 个到期且未被占用的任务，返回 `(词语 id, 词语, 已尝试次数, 是否跳过缓存)`。
+
+        - 领取在写锁（`BEGIN IMMEDIATE`）内完成，多个 worker 不会领取到同一任务
+        - 任务的租约持续 `lease_seconds` 秒，期间其他 worker 不会领取
+        """
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    """
+                    SELECT q.word_id, w.word, q.attempts, q.refresh FROM queue q
+                    JOIN words w ON w.id = q.word_id
+                    WHERE q.next_attempt_at <= ? AND q.lease_until <= ?
+                      AND q.attempts < ?
+                    ORDER BY q.next_attempt_at, q.word_id LIMIT ?
+                    """,
+                    (now, now, max_attempts, count),
+                ).fetchall()
+                self.conn.executemany(
+                    "UPDATE queue SET lease_until = ? WHERE word_id = ?",
+                    [(now + lease_seconds, row[0]) for row in rows],
+                )
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+            return [(row[0], row[1], row[2], bool(row[3])) for row in rows]
+        except Exception as e:
+            raise DatabaseUpdateError(e) from e
+
+    def next_job_time(self, max_attempts: int) -> float | None:
+        """返回最近一个任务可被领取的时刻，队列中没有可重试的任务时返回 None。"""
+        try:
+            return self.conn.execute(
+                """
+                SELECT MIN(MAX(next_attempt_at, lease_until)) FROM queue
+                WHERE attempts < ?
+                """,
+                (max_attempts,),
+            ).fetchone()[0]
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    @traced("db.enqueue_regen")
+    def enqueue_regen(
+        self,
+        min_id: int | None = None,
+        max_id: int | None = None,
+        before: str | None = None,
+        model: str | None = None,
+        skip: tuple[str, str] | None = None,
+        refresh: bool = False,
+        include_manual: bool = False,
+    ) -> int:
+        """将符合条件的词语加入生成队列，返回新加入的任务数。
+
+        - 可按 id 闭区间、更新时间（早于 `before`）与生成所用的模型筛选
+        - `skip` 为 `(模型, 提示词摘要)` 时跳过已由其生成的词语
+        - `include_manual` 为 False 时跳过手动设置或导入的词语（模型为 NULL）
+        - `refresh` 为 True 时生成不读取响应缓存，已在队列中的词语也一并标记
+        - 已在队列中的词语保持原有的尝试次数
+        """
+        conditions: list[str] = []
+        if not include_manual:
+            conditions.append("model IS NOT NULL")
+        params: list[int | str] = []
+        if min_id is not None:
+            conditions.append("id >= ?")
+            params.append(min_id)
+        if max_id is not None:
+            conditions.append("id <= ?")
+            params.append(max_id)
+        if before is not None:
+            conditions.append("updated_at < ?")
+            params.append(before)
+        if model is not None:
+            conditions.append("model = ?")
+            params.append(model)
+        if skip is not None:
+            conditions.append("NOT (model IS ? AND prompt_hash IS ?)")
+            params.extend(skip)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        try:
+            with self.conn:
+                if refresh:
+                    self.conn.execute(
+                        "UPDATE queue SET refresh = 1 "
+                        f"WHERE word_id IN (SELECT id FROM words {where})",
+                        params,
+                    )
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO queue(word_id, refresh) "
+                    f"SELECT id, ? FROM words {where}",
+                    [int(refresh), *params],
+                )
+            return cur.rowcount
+        except Exception as e:
+            raise DatabaseInsertError(e) from e
+
+    @traced("db.complete_job")
+    def complete_job(
+        self,
+        word_id: int,
+        meaning: str,
+        model: str | None = None,
+        prompt_hash: str | None = None,
+    ) -> None:
+        """写入生成的词义与生成来源，并移出队列。"""
+        try:
+            with self.conn:
+                self.conn.execute(
+                    """
+                    UPDATE words SET meaning = ?, model = ?, prompt_hash = ?
+                    WHERE id = ?
+                    """,
+                    (meaning, model, prompt_hash, word_id),
+                )
+                self.conn.execute("DELETE FROM queue WHERE word_id = ?", (word_id,))
+        except Exception as e:
+            raise DatabaseUpdateError(e) from e
+
+    @traced("db.fail_job")
+    def fail_job(self, word_id: int, error: str, next_attempt_at: float) -> None:
+        """记录一次失败，释放租约并安排下次尝试的时刻。"""
+        try:
+            with self.conn:
+                self.conn.execute(
+                    """
+                    UPDATE queue SET attempts = attempts + 1, last_error = ?,
+                      next_attempt_at = ?, lease_until = 0
+                    WHERE word_id = ?
+                    """,
+                    (error, next_attempt_at, word_id),
+                )
+        except Exception as e:
+            raise DatabaseUpdateError(e) from e
+
+    def release_jobs(self, word_ids: Sequence[int]) -> None:
+        """释放未完成任务的租约，使其可以立即被重新领取。"""
+        try:
+            with self.conn:
+                for i in range(0, len(word_ids), _MAX_VARIABLES):
+                    chunk = word_ids[i : i + _MAX_VARIABLES]
+                    self.conn.execute(
+                        "UPDATE queue SET lease_until = 0 "
+                        f"WHERE word_id IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+        except Exception as e:
+            raise DatabaseUpdateError(e) from e
+
+    def queue_status(self, max_attempts: int) -> tuple[int, list[tuple[str, int, str]]]:
+        """返回 `(可重试的任务数, [(词语, 尝试次数, 最后的错误)])`，后者为失败次数已达上限的任务。"""
+        try:
+            pending = self.conn.execute(
+                "SELECT COUNT(*) FROM queue WHERE attempts < ?", (max_attempts,)
+            ).fetchone()[0]
+            failed = self.conn.execute(
+                """
+                SELECT w.word, q.attempts, q.last_error FROM queue q
+                JOIN words w ON w.id = q.word_id
+                WHERE q.attempts >= ? ORDER BY q.word_id
+                """,
+                (max_attempts,),
+            ).fetchall()
+            return pending, [(row[0], row[1], row[2] or "") for row in failed]
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    def reset_failed_jobs(self, max_attempts: int) -> int:
+        """清零失败次数已达上限的任务，使其重新进入队列，返回任务数。"""
+        try:
+            with self.conn:
+                cur = self.conn.execute(
+                    """
+                    UPDATE queue SET attempts = 0, next_attempt_at = 0, lease_until = 0
+                    WHERE attempts >= ?
+                    """,
+                    (max_attempts,),
+                )
+            return cur.rowcount
+        except Exception as e:
+            raise DatabaseUpdateError(e) from e
+
+    def database_id(self) -> str:
+        """返回数据库的唯一标识，首次调用时生成，用于区分同步的对端。"""
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO meta(key, value) VALUES ('database_id', ?)",
+                    (uuid.uuid4().hex,),
+                )
+            return self.conn.execute(
+                "SELECT value FROM meta WHERE key = 'database_id'"
+            ).fetchone()[0]
+        except Exception as e:
+            raise DatabaseError(e) from e
+
+    def sync_watermark(self, peer_id: str) -> int:
+        """返回已从对端同步到的修改序号，从未同步时为 0。"""
+        try:
+            row = self.conn.execute(
+                "SELECT value FROM meta WHERE key = ?", (f"sync:{peer_id}",)
+            ).fetchone()
+            return int(row[0]) if row else 0
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    def iter_changes(self, since: int, batch_size: int = 1000) -> Iterator[Change]:
+        """按修改序号升序逐行返回序号大于 `since` 的修改。
+
+        - 词语已删除时词义等字段为 None，否则删除时间为 None
+        """
+        try:
+            cur = self.conn.cursor()
+            cur.row_factory = None
+            cur.execute(
+                """
+                SELECT c.seq, c.word, w.meaning, w.created_at, w.updated_at,
+                  w.model, w.prompt_hash, t.deleted_at
+                FROM changes c
+                LEFT JOIN words w ON w.word = c.word
+                LEFT JOIN tombstones t ON t.word = c.word
+                WHERE c.seq > ? ORDER BY c.seq ASC
+                """,
+                (since,),
+            )
+            while rows := cur.fetchmany(batch_size):
+                yield from rows
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    def _apply_delete(self, word: str, deleted_at: str) -> bool:
+        """应用对端的删除，本地词条在删除之后没有更新时删除，返回是否删除了词条。"""
+        row = self.conn.execute(
+            "SELECT id, updated_at FROM words WHERE word = ?", (word,)
+        ).fetchone()
+        if row is not None:
+            if row["updated_at"] > deleted_at:
+                return False
+            self.conn.execute("DELETE FROM words WHERE id = ?", (row["id"],))
+            # 触发器以当前时间记录删除，改为对端的删除时间
+            self.conn.execute(
+                "UPDATE tombstones SET deleted_at = ? WHERE word = ?",
+                (deleted_at, word),
+            )
+            return True
+        tombstone = self.conn.execute(
+            "SELECT deleted_at FROM tombstones WHERE word = ?", (word,)
+        ).fetchone()
+        if tombstone is None or tombstone[0] < deleted_at:
+            # 本地没有该词语时仍记录删除，以便继续同步给其他数据库
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tombstones(word, deleted_at) VALUES (?, ?)",
+                (word, deleted_at),
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO changes(word) VALUES (?)", (word,)
+            )
+        return False
+
+    def _apply_word(
+        self,
+        word: str,
+        meaning: str,
+        created_at: str,
+        updated_at: str,
+        model: str | None,
+        prompt_hash: str | None,
+    ) -> bool:
+        """应用对端的词条，对端更新时间较新时写入并保留其时间，返回是否写入。
+
+        - 更新时间相同时比较词义，使两端得到相同的结果
+        - 词义为空（尚待生成）的一方总是让位于已有词义的一方
+        """
+        row = self.conn.execute(
+            "SELECT id, meaning, updated_at FROM words WHERE word = ?", (word,)
+        ).fetchone()
+        if row is None:
+            tombstone = self.conn.execute(
+                "SELECT deleted_at FROM tombstones WHERE word = ?", (word,)
+            ).fetchone()
+            if tombstone is not None and tombstone[0] >= updated_at:
+                return False
+            self.conn.execute(
+                """
+                INSERT INTO words(word, meaning, created_at, updated_at, model, prompt_hash)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (word, meaning, created_at, updated_at, model, prompt_hash),
+            )
+            return True
+        if row["meaning"] and (updated_at, meaning) <= (
+            row["updated_at"],
+            row["meaning"],
+        ):
+            return False
+        self.conn.execute(
+            """
+            UPDATE words SET meaning = ?, updated_at = ?, model = ?, prompt_hash = ?
+            WHERE id = ?
+            """,
+            (meaning, updated_at, model, prompt_hash, row["id"]),
+        )
+        return True
+
+    @traced("db.apply_changes")
+    def apply_changes(
+        self,
+        peer_id: str,
+        changes: Sequence[Change],
+    ) -> tuple[int, int]:
+        """在单个事务中应用对端 `iter_changes` 返回的一批修改，并推进对端的同步序号。
+
+        - 冲突时保留更新时间较新的一方，删除与修改比较删除时间与更新时间
+        - 对端词义为空（尚待生成）的词条不同步，生成后会作为新的修改再次同步
+        - 返回 `(写入的词条数, 删除的词条数)`
+        """
+        written = deleted = 0
+        try:
+            with self.conn:
+                for (
+                    _,
+                    word,
+                    meaning,
+                    created_at,
+                    updated_at,
+                    model,
+                    prompt_hash,
+                    deleted_at,
+                ) in changes:
+                    if meaning is None:
+                        if deleted_at is not None:
+                            deleted += self._apply_delete(word, deleted_at)
+                    elif meaning:
+                        written += self._apply_word(
+                            word, meaning, created_at, updated_at, model, prompt_hash
+                        )
+                if changes:
+                    self.conn.execute(
+                        """
+                        INSERT INTO meta(key, value) VALUES (?, ?)
+                        ON CONFLICT(key) DO UPDATE SET value = excluded.value;
+                        """,
+                        (f"sync:{peer_id}", str(changes[-1][0])),
+                    )
+            return written, deleted
+        except Exception as e:
+            raise DatabaseUpdateError(e) from e
+
+    def _locate(self, position: int) -> tuple[int, int] | None:
+        """通过位置索引定位第 `position` 个词条，返回 `(块起始 id, 块内偏移)`。"""
+        row = self.conn.execute(
+            """
+            SELECT block, acc - n AS before FROM (
+              SELECT block, n, SUM(n) OVER (ORDER BY block) AS acc FROM word_blocks
+            )
+            WHERE acc >= ? ORDER BY block LIMIT 1
+            """,
+            (position,),
+        ).fetchone()
+        if row is None:
+            return None
+        return row["block"] * _BLOCK_SIZE, position - 1 - row["before"]
+
+    def _iter_id_rows(
+        self, sql: str, params: Sequence[int], batch_size: int
+    ) -> Iterator[tuple[int, str, str]]:
+        """执行读取 `(id, 词语, 词义)` 的查询，每次从游标读取 `batch_size` 行并逐行返回。"""
+        cur = self.conn.cursor()
+        cur.row_factory = None
+        try:
+            cur.execute(sql, params)
+            while rows := cur.fetchmany(batch_size):
+                yield from rows
+        finally:
+            cur.close()
+
+    @traced("db.query_range")
     def query_range(self, start: int, end: int) -> list[WordTable]:
-        """按 id 升序返回闭区间 [start, end] 的词条。"""
+        """按 id 升序返回位置闭区间 [start, end] 的词条。"""
+        return [
+            WordTable(word, meaning) for _, word, meaning in self.iter_range(start, end)
+        ]
+
+    def iter_range(
+        self, start: int, end: int, batch_size: int = 1000
+    ) -> Iterator[tuple[int, str, str]]:
+        """按 id 升序逐行返回位置闭区间 [start, end] 的 `(id, 词语, 词义)`，内存占用与范围大小无关。"""
         try:
-            offset = max(0, start - 1)
-            limit = max(0, end - start + 1)
-            cur = self.conn.execute(
-                "SELECT * FROM words ORDER BY id ASC LIMIT ? OFFSET ?",
-                (limit, offset),
+            located = self._locate(max(1, start))
+            if located is None:
+                return
+            first_id, offset = located
+            yield from self._iter_id_rows(
+                """
+                SELECT id, word, meaning FROM words WHERE id >= ?
+                ORDER BY id ASC LIMIT ? OFFSET ?
+                """,
+                (first_id, max(0, end - start + 1), offset),
+                batch_size,
+            )
+        except Exception as e:
+            raise DatabaseQueryError(e) from e
+
+    def iter_after(
+        self, last_id: int, count: int, batch_size: int = 1000
+    ) -> Iterator[tuple[int, str, str]]:
+        """按 id 升序逐行返回 id 大于 `last_id` 的 `count` 个 `(id, 词语, 词义)`。"""
+        try:
+            yield from self._iter_id_rows(
+                """
+                SELECT id, word, meaning FROM words WHERE id > ?
+                ORDER BY id ASC LIMIT ?
+                """,
+                (last_id, count),
+                batch_size,
             )
-            return [WordTable(row["word"], row["meaning"]) for row in cur.fetchall()]
         except Exception as e:
             raise DatabaseQueryError(e) from e
@@ -3,16 +3,111 @@
 封装对词库的读取与写入、以及对大模型接口的调用与结果清洗。
 """
 
-from openai import OpenAI
+import hashlib
+import itertools
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections.abc import Callable, Container, Iterable, Iterator
+from typing import TYPE_CHECKING
 
+import snapshot
+import tracing
+from cache import ResponseCache
 from db import DictDataBase, WordTable
 from err import (
+    AppError,
     DatabaseInsertError,
+    DictError,
     ParseApiResponseError,
     RequestApiError,
     UserInterruptError,
 )
+from ratelimit import RateLimiter, backoff_delay, parse_retry_after
 from settings import Settings
+from snapshot import Snapshot
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+
+# 模型可能在释义前附加的提示词，按顺序逐个去除
+_MARKERS = ("释义：", "释义:", "定义：", "定义:")
+_MAX_MARKER_LEN = max(len(m) for m in _MARKERS)
+
+# 可重试的 HTTP 状态码，此外 5xx 与连接错误（含超时）也会重试
+_RETRY_STATUS = (408, 409, 429)
+
+
+def _is_retryable(e: Exception) -> bool:
+    """判断接口错误是否值得重试。"""
+    import openai
+
+    if isinstance(e, openai.APIConnectionError):
+        return True
+    if isinstance(e, openai.APIStatusError):
+        return e.status_code in _RETRY_STATUS or e.status_code >= 500
+    return False
+
+
+def _strip_markers(text: str) -> str:
+    """去除开头可能出现的“释义”等提示词。"""
+    for marker in _MARKERS:
+        if text.startswith(marker):
+            text = text[len(marker) :].lstrip()
+    return text
+
+
+def _clean_meaning(content: str) -> str:
+    """简单清洗：去除提示词与多余换行/空白，并保证以句号结尾。"""
+    cleaned = _strip_markers(content.strip())
+    if not cleaned.endswith("。"):
+        cleaned += "。"
+    return cleaned
+
+
+class _MeaningCleaner:
+    """`_clean_meaning` 的增量版本，边接收边输出。
+
+    开头的内容先缓存，直到去除提示词后剩余的字符足以确定不会再匹配提示词；
+    尾部空白暂缓输出，遇到后续非空白字符时再一并输出。所有输出拼接后与
+    `_clean_meaning` 对完整内容的结果一致。
+    """
+
+    def __init__(self) -> None:
+        self._head = ""
+        self._started = False
+        self._pending_space = ""
+        self._last_char = ""
+
+    def feed(self, text: str) -> str:
+        """接收一段新内容，返回此时可以输出的部分。"""
+        if not self._started:
+            self._head += text
+            text = _strip_markers(self._head.lstrip())
+            if len(text) < _MAX_MARKER_LEN:
+                return ""
+            self._started = True
+        text = self._pending_space + text
+        body = text.rstrip()
+        self._pending_space = text[len(body) :]
+        if body:
+            self._last_char = body[-1]
+        return body
+
+    def finish(self) -> str:
+        """内容接收完毕，返回剩余的输出（丢弃尾部空白，必要时补句号）。"""
+        out = ""
+        if not self._started:
+            self._started = True
+            out = _strip_markers(self._head.strip())
+            self._last_char = out[-1:]
+        if self._last_char != "。":
+            out += "。"
+        return out
 
 
 class Dict:
@@ -20,24 +115,253 @@ class Dict:
 
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
-        self.db = DictDataBase(self.settings.db_path)
+        self._db: DictDataBase | None = None
+        self._snapshot: Snapshot | None = None
+        self._snapshot_key: tuple[object, ...] | None = None
+        self._client: OpenAI | None = None
+        self._client_lock = threading.Lock()
+        # 用户中断时设置，正在等待限速或重试的请求随即放弃，不再发出新请求
+        self._stop = threading.Event()
+        self._limiter = RateLimiter(
+            settings.requests_per_minute,
+            settings.tokens_per_minute,
+            sleep=self._stop.wait,
+        )
+        self._cache: ResponseCache | None = None
+        self._cache_lock = threading.Lock()
 
-    def _query_api(self, word: str) -> str:
-        """调用大模型生成词语释义，并进行简单清洗。"""
-        client = OpenAI(base_url=self.settings.base_url, api_key=self.settings.api_key)
+    @property
+    def db(self) -> DictDataBase:
+        """数据库连接，首次访问时打开；查询命中有效快照时无需打开。"""
+        if self._db is None:
+            self._db = self._open_db(self.settings.db_path)
+        return self._db
 
-        try:
-            response = client.chat.completions.create(
-                model=self.settings.model,
-                messages=[
-                    {"role": "system", "content": self.settings.system_prompt},
-                    {"role": "user", "content": word},
-                ],
-                temperature=self.settings.temperature,
-                stream=False,
+    def _open_db(self, path: str) -> DictDataBase:
+        """按配置的连接参数打开 `path` 处的数据库。"""
+        with tracing.span("db.open"):
+            return DictDataBase(
+                path,
+                {
+                    "journal_mode": self.settings.db_journal_mode,
+                    "synchronous": self.settings.db_synchronous,
+                    "cache_size": self.settings.db_cache_size,
+                    "mmap_size": self.settings.db_mmap_size,
+                    "busy_timeout": self.settings.db_busy_timeout,
+                },
+                self.settings.db_cached_statements,
             )
+
+    def _get_snapshot(self) -> Snapshot | None:
+        """返回与数据库一致的快照，未编译或已过期时返回 None。
+
+        - 数据库与 WAL 文件状态和快照记录的一致时，无需打开 SQLite
+        - 不一致时比较词表修改计数与词条数，未变（如只写入了阅读游标）则更新快照记录的文件状态
+        - 同一进程中按文件状态缓存判断结果，数据库变化或快照重新编译后重新判断
+        """
+        if not self.settings.use_snapshot:
+            return None
+        current = snapshot.fingerprint(self.settings.db_path)
+        key = (current, snapshot.file_id(self.settings.snapshot_path))
+        if key == self._snapshot_key:
+            return self._snapshot
+        if self._snapshot is not None:
+            self._snapshot.close()
+        snap = Snapshot.open(self.settings.snapshot_path)
+        if snap is not None and snap.fingerprint != current:
+            if (
+                self.db.generation() == snap.generation
+                and self.db.count_words() == snap.count
+            ):
+                snap.stamp(current)
+            else:
+                snap.close()
+                snap = None
+        self._snapshot = snap
+        self._snapshot_key = key
+        return snap
+
+    def compile_snapshot(self) -> int:
+        """将词表编译为快照文件，返回词条数。
+
+        - 先执行 WAL 检查点，使编译时记录的文件状态在之后的只读会话中保持不变
+        - 在读事务中读取修改计数与全部词条，编译期间其他进程的写入不会混入
+        """
+        self.db.checkpoint()
+        # 文件状态须在读取数据之前获取：期间若有写入，快照会被判定为需要复核而不是误判为有效
+        current = snapshot.fingerprint(self.settings.db_path)
+        with self.db.read_transaction():
+            generation = self.db.generation()
+            count = self.db.count_words()
+            snapshot.write(
+                self.settings.snapshot_path,
+                count,
+                self.db.iter_id_words(),
+                self.db.iter_ids_by_word,
+                generation,
+                current,
+            )
+        return count
+
+    def _get_client(self) -> "OpenAI":
+        """懒加载 OpenAI 客户端，整个 `Dict` 生命周期内复用同一连接池。
+
+        - `openai` 体积较大，仅在首次需要生成释义时才导入，只读命令不受影响
+        """
+        with self._client_lock:
+            if self._client is None:
+                with tracing.span("api.client"):
+                    import httpx
+                    from openai import DefaultHttpxClient, OpenAI
+
+                    timeout = httpx.Timeout(
+                        self.settings.timeout, connect=self.settings.connect_timeout
+                    )
+                    http_client = DefaultHttpxClient(
+                        limits=httpx.Limits(
+                            max_connections=self.settings.max_connections,
+                            max_keepalive_connections=self.settings.max_keepalive_connections,
+                            keepalive_expiry=self.settings.keepalive_expiry,
+                        ),
+                        timeout=timeout,
+                    )
+                    self._client = OpenAI(
+                        base_url=self.settings.base_url,
+                        api_key=self.settings.api_key,
+                        timeout=timeout,
+                        http_client=http_client,
+                        # 由 `_call_api` 统一限速与重试
+                        max_retries=0,
+                    )
+            return self._client
+
+    def _get_cache(self) -> ResponseCache | None:
+        """懒加载响应缓存，未启用时返回 None。"""
+        if not self.settings.cache_enabled:
+            return None
+        with self._cache_lock:
+            if self._cache is None:
+                self._cache = ResponseCache(
+                    self.settings.cache_path,
+                    self.settings.cache_max_entries,
+                    self.settings.cache_max_age_days,
+                )
+            return self._cache
+
+    def _cache_key(self, word: str) -> str:
+        """计算当前接口配置下 `word` 的缓存键。"""
+        return ResponseCache.make_key(
+            self.settings.base_url,
+            self.settings.model,
+            self.settings.system_prompt,
+            self.settings.temperature,
+            word,
+        )
+
+    def _provenance(self) -> tuple[str, str]:
+        """返回当前生成词义所用的 `(模型, 提示词摘要)`，记录在词条中供 `regen` 筛选。"""
+        digest = hashlib.sha256(self.settings.system_prompt.encode("utf-8"))
+        return self.settings.model, digest.hexdigest()[:16]
+
+    def _query_api(
+        self,
+        word: str,
+        on_text: Callable[[str], None] | None = None,
+        refresh: bool = False,
+    ) -> str:
+        """生成词语释义，优先读取响应缓存，未命中时请求接口并写入缓存。
+
+        - 给定 `on_text` 时以流式方式请求，释义片段到达即输出；命中缓存时一次输出
+        - `refresh` 为 True 时不读取缓存，生成的释义仍写入缓存
+        """
+        with tracing.span("dict.query_api", word=word) as attrs:
+            cache = self._get_cache()
+            key = self._cache_key(word) if cache else ""
+            cached = cache.get(key) if cache and not refresh else None
+            attrs["cached"] = cached is not None
+            if cached is not None:
+                if on_text:
+                    on_text(cached)
+                return cached
+            if on_text:
+                meaning = self._request_api_stream(word, on_text)
+            else:
+                meaning = self._request_api(word)
+            if cache:
+                cache.put(key, meaning)
+            return meaning
+
+    def _estimate_tokens(self, prompt: str, words: int) -> int:
+        """粗略估计一次请求消耗的 token 数：提示词按每字符一个 token 计，加上预计的输出。"""
+        return len(prompt) + words * self.settings.estimated_completion_tokens
+
+    def _call_api[T](
+        self, create: Callable[[], T], estimate: int, attrs: dict[str, object]
+    ) -> T:
+        """在限速下发出请求，遇到可重试的错误时按指数退避重试。
+
+        - 429 同时降低限速，并让所有并发请求等待 `Retry-After` 指定的时间
+        - 重试次数用尽或错误不可重试时抛出最后一次的错误
+        - 只重试 `create` 本身，流式响应开始输出后的中断不重试，以免重复输出
+        - 已中断（见 `interrupt`）时不再发出请求，也不再重试
+        """
+        attempt = 0
+        while True:
+            self._limiter.acquire(estimate)
+            if self._stop.is_set():
+                raise UserInterruptError("interrupted")
+            try:
+                result = create()
+            except Exception as e:
+                self._limiter.settle(estimate, 0)
+                if self._stop.is_set():
+                    raise UserInterruptError("interrupted") from e
+                if attempt >= self.settings.max_retries or not _is_retryable(e):
+                    raise
+                response = getattr(e, "response", None)
+                retry_after = parse_retry_after(getattr(response, "headers", None))
+                if getattr(e, "status_code", None) == 429:
+                    self._limiter.on_throttle(retry_after)
+                self._stop.wait(
+                    backoff_delay(
+                        attempt,
+                        self.settings.retry_base_delay,
+                        self.settings.retry_max_delay,
+                        retry_after,
+                    )
+                )
+                attempt += 1
+                attrs["retries"] = attempt
+                continue
+            self._limiter.on_success()
+            usage = getattr(result, "usage", None)
+            if usage is not None:
+                self._limiter.settle(estimate, usage.total_tokens)
+            return result
+
+    def _request_api(self, word: str) -> str:
+        """调用大模型生成词语释义，并进行简单清洗。"""
+        client = self._get_client()
+        try:
+            with tracing.span("api.request", word=word) as attrs:
+                response = self._call_api(
+                    lambda: client.chat.completions.create(
+                        model=self.settings.model,
+                        messages=[
+                            {"role": "system", "content": self.settings.system_prompt},
+                            {"role": "user", "content": word},
+                        ],
+                        temperature=self.settings.temperature,
+                        stream=False,
+                    ),
+                    self._estimate_tokens(self.settings.system_prompt + word, 1),
+                    attrs,
+                )
+                tracing.record_usage(attrs, response.usage)
         except KeyboardInterrupt as e:
             raise UserInterruptError from e
+        except UserInterruptError:
+            raise
         except Exception as e:
             raise RequestApiError(e) from e
         else:
@@ -50,20 +374,454 @@ class Dict:
             except Exception as e:
                 raise ParseApiResponseError(e) from e
 
-            # 简单清洗：去除可能出现的“释义”提示词与多余换行/空白
-            cleaned = content.strip()
-            for marker in ("释义：", "释义:", "定义：", "定义:"):
-                if cleaned.startswith(marker):
-                    cleaned = cleaned[len(marker) :].lstrip()
-            if not cleaned.endswith("。"):
-                cleaned += "。"
-            return cleaned
-
-    def add_word(self, word: str) -> None:
-        """新增词语并自动生成释义。若已存在则抛出写入错误。"""
+            return _clean_meaning(content)
+
+    def _request_api_stream(self, word: str, on_text: Callable[[str], None]) -> str:
+        """以流式方式调用大模型，清洗后的释义片段到达即通过 `on_text` 输出。"""
+        cleaner = _MeaningCleaner()
+        parts: list[str] = []
+        client = self._get_client()
+        try:
+            with tracing.span("api.stream", word=word) as attrs:
+                estimate = self._estimate_tokens(self.settings.system_prompt + word, 1)
+                stream = self._call_api(
+                    lambda: client.chat.completions.create(
+                        model=self.settings.model,
+                        messages=[
+                            {"role": "system", "content": self.settings.system_prompt},
+                            {"role": "user", "content": word},
+                        ],
+                        temperature=self.settings.temperature,
+                        stream=True,
+                        # 最后一个数据块附带 token 用量
+                        stream_options={"include_usage": True},
+                    ),
+                    estimate,
+                    attrs,
+                )
+                for chunk in stream:
+                    if chunk.usage is not None:
+                        self._limiter.settle(estimate, chunk.usage.total_tokens)
+                    tracing.record_usage(attrs, chunk.usage)
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        text = cleaner.feed(delta)
+                        if text:
+                            on_text(text)
+        except KeyboardInterrupt as e:
+            raise UserInterruptError from e
+        except UserInterruptError:
+            raise
+        except Exception as e:
+            raise RequestApiError(e) from e
+
+        content = "".join(parts)
+        if not content:
+            raise ParseApiResponseError(
+                RequestApiError(f"the response content for word `{word}` is null")
+            )
+        on_text(cleaner.finish())
+        return _clean_meaning(content)
+
+    def _request_api_batch(self, words: list[str]) -> dict[str, str]:
+        """一次请求生成多个词语的释义，返回 `{词语: 清洗后的释义}`。
+
+        - 要求模型以 JSON 对象返回，缺失、非字符串或为空的释义不会出现在结果中
+        """
+        system_prompt = f"{self.settings.system_prompt}\n{self.settings.batch_prompt}"
+        client = self._get_client()
+        content = json.dumps(words, ensure_ascii=False)
+        try:
+            with tracing.span("api.batch", words=len(words)) as attrs:
+                response = self._call_api(
+                    lambda: client.chat.completions.create(
+                        model=self.settings.model,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": content},
+                        ],
+                        temperature=self.settings.temperature,
+                        response_format={"type": "json_object"},
+                        stream=False,
+                    ),
+                    self._estimate_tokens(system_prompt + content, len(words)),
+                    attrs,
+                )
+                tracing.record_usage(attrs, response.usage)
+        except KeyboardInterrupt as e:
+            raise UserInterruptError from e
+        except UserInterruptError:
+            raise
+        except Exception as e:
+            raise RequestApiError(e) from e
+
+        try:
+            data = json.loads(response.choices[0].message.content or "")
+            if not isinstance(data, dict):
+                raise TypeError("the batch response is not a json object")
+        except Exception as e:
+            raise ParseApiResponseError(e) from e
+        return {
+            w: _clean_meaning(data[w])
+            for w in words
+            if isinstance(data.get(w), str) and data[w].strip()
+        }
+
+    def _generate(
+        self, words: list[str], refresh: Container[str] = ()
+    ) -> dict[str, str]:
+        """为一组词语生成释义，返回 `{词语: 释义}`。
+
+        - 单个词语直接请求，失败时抛出错误
+        - 多个词语先读取缓存，其余合并为一次请求；批量请求失败时不抛错，
+          结果中缺失的词语由调用方退回单独请求
+        - `refresh` 中的词语不读取缓存
+        """
+        if len(words) == 1:
+            return {words[0]: self._query_api(words[0], refresh=words[0] in refresh)}
+
+        cache = self._get_cache()
+        keys = {w: self._cache_key(w) for w in words} if cache else {}
+        meanings: dict[str, str] = {}
+        if cache:
+            for w in words:
+                if w in refresh:
+                    continue
+                cached = cache.get(keys[w])
+                if cached is not None:
+                    meanings[w] = cached
+        missing = [w for w in words if w not in meanings]
+        if not missing:
+            return meanings
+        try:
+            generated = self._request_api_batch(missing)
+        except (RequestApiError, ParseApiResponseError):
+            return meanings
+        if cache:
+            for w, meaning in generated.items():
+                cache.put(keys[w], meaning)
+        return meanings | generated
+
+    def add_word(self, word: str, on_text: Callable[[str], None] | None = None) -> None:
+        """新增词语并自动生成释义。若已存在则抛出写入错误。
+
+        - 给定 `on_text` 时释义以流式方式生成，片段到达即通过 `on_text` 输出
+        """
         if self.db.query_word(word):
             raise DatabaseInsertError(f"word '{word}' already exists")
-        self.db.insert_word(word, self._query_api(word))
+        self.db.insert_word(word, self._query_api(word, on_text), *self._provenance())
+
+    def _generate_worker(
+        self,
+        tasks: queue.SimpleQueue[list[str] | None],
+        results: queue.SimpleQueue[tuple[list[str], dict[str, str] | AppError | None]],
+        closed: threading.Event,
+        refresh: Container[str],
+    ) -> None:
+        """逐个领取任务生成释义，结果或错误放入 `results`；收到 None 或已中断时退出。
+
+        - 意外的错误结束线程并由线程的默认处理输出，结果记为 None 以免调用线程一直等待
+        """
+        while (chunk := tasks.get()) is not None:
+            if closed.is_set() or self._stop.is_set():
+                return
+            outcome: dict[str, str] | AppError | None = None
+            try:
+                outcome = self._generate(chunk, refresh)
+            except AppError as e:
+                outcome = e
+            finally:
+                results.put((chunk, outcome))
+
+    def _generate_words(
+        self,
+        words: list[str],
+        max_workers: int | None,
+        batch_size: int | None,
+        refresh: Container[str] = (),
+    ) -> Iterator[tuple[str, str | None, AppError | None]]:
+        """并发生成一组不重复词语的释义，按完成顺序逐个返回 `(词语, 释义, 错误)`。
+
+        - 接口请求在工作线程中并发执行，结果在调用线程中返回
+        - `batch_size` 大于 1 时每次请求合并多个词语，未得到有效释义的词语再单独请求
+        - 单个词语失败不会中断其余词语，失败时释义为 None
+        - `refresh` 中的词语不读取响应缓存
+        - 工作线程为守护线程：中断后不再领取任务，进行中的请求也不会阻塞进程退出
+        """
+        # 在启动并发请求前解析 API Key，缺失时整批直接失败
+        _ = self.settings.api_key
+        self._stop.clear()
+        size = batch_size or self.settings.batch_size
+        workers = min(max_workers or self.settings.max_workers, len(words))
+        tasks: queue.SimpleQueue[list[str] | None] = queue.SimpleQueue()
+        results: queue.SimpleQueue[
+            tuple[list[str], dict[str, str] | AppError | None]
+        ] = queue.SimpleQueue()
+        closed = threading.Event()
+        pending = 0
+        for chunk in itertools.batched(words, size):
+            tasks.put(list(chunk))
+            pending += 1
+        threads = [
+            threading.Thread(
+                target=self._generate_worker,
+                args=(tasks, results, closed, refresh),
+                name=f"kgdict-generate-{i}",
+                daemon=True,
+            )
+            for i in range(workers)
+        ]
+        for t in threads:
+            t.start()
+        try:
+            while pending:
+                chunk, outcome = results.get()
+                pending -= 1
+                if outcome is None:
+                    raise DictError(f"failed to generate meanings for {chunk}")
+                if isinstance(outcome, UserInterruptError):
+                    raise outcome
+                if isinstance(outcome, AppError):
+                    for word in chunk:
+                        yield word, None, outcome
+                    continue
+                for word in chunk:
+                    if word not in outcome:
+                        # 批量结果中缺失或格式错误的词语退回单独请求
+                        tasks.put([word])
+                        pending += 1
+                        continue
+                    yield word, outcome[word], None
+        except KeyboardInterrupt as e:
+            self.interrupt()
+            raise UserInterruptError from e
+        finally:
+            closed.set()
+            for _ in threads:
+                tasks.put(None)
+
+    def add_words(
+        self,
+        words: Iterable[str],
+        max_workers: int | None = None,
+        batch_size: int | None = None,
+    ) -> Iterator[tuple[str, AppError | None]]:
+        """并发生成释义并写入，按完成顺序逐个返回 `(词语, 错误)`。
+
+        - 数据库写入始终在调用线程中完成，并发方式见 `_generate_words`
+        - 单个词语失败不会中断其余词语，错误随结果返回，成功时为 None
+        """
+        unique = list(dict.fromkeys(words))
+        existing = self.db.existing_words(unique)
+        pending: list[str] = []
+        for word in unique:
+            if word in existing:
+                yield word, DatabaseInsertError(f"word '{word}' already exists")
+            else:
+                pending.append(word)
+        if not pending:
+            return
+
+        for word, meaning, err in self._generate_words(
+            pending, max_workers, batch_size
+        ):
+            if err is None:
+                try:
+                    self.db.insert_word(word, meaning, *self._provenance())
+                except AppError as e:
+                    err = e
+            yield word, err
+
+    def defer_words(
+        self, words: Iterable[str]
+    ) -> Iterator[tuple[str, AppError | None]]:
+        """立即写入词语（词义为空）并加入生成队列，由 `process_queue` 在后台生成释义。
+
+        - 已存在的词语返回写入错误，成功时错误为 None
+        """
+        unique = list(dict.fromkeys(words))
+        queued = self.db.enqueue_words(unique)
+        for word in unique:
+            if word in queued:
+                yield word, None
+            else:
+                yield word, DatabaseInsertError(f"word '{word}' already exists")
+
+    def process_queue(
+        self,
+        max_workers: int | None = None,
+        batch_size: int | None = None,
+        watch: bool = False,
+        wake: threading.Event | None = None,
+    ) -> Iterator[tuple[str, AppError | None]]:
+        """处理生成队列，按完成顺序逐个返回 `(词语, 错误)`。
+
+        - 每轮领取一批到期的任务并加租约，并发生成释义后写回；进程中断时未完成的任务
+          立即释放，崩溃时租约（`queue_lease_seconds`）到期后可被任意 worker 重新领取
+        - 失败的任务按指数退避安排下次尝试，失败 `queue_max_attempts` 次后不再重试
+        - 没有到期任务时等待到最近的重试时刻；`watch` 为 False 时队列处理完即返回，
+          否则持续轮询新任务，`wake` 被设置时立即检查
+        """
+        settings = self.settings
+        size = batch_size or settings.batch_size
+        workers = max_workers or settings.max_workers
+        while True:
+            now = time.time()
+            jobs = self.db.lease_jobs(
+                workers * size,
+                now,
+                settings.queue_lease_seconds,
+                settings.queue_max_attempts,
+            )
+            if not jobs:
+                next_at = self.db.next_job_time(settings.queue_max_attempts)
+                if next_at is None and not watch:
+                    return
+                timeout = settings.queue_poll_interval
+                if next_at is not None:
+                    timeout = min(timeout, max(0.0, next_at - now))
+                if wake is None:
+                    time.sleep(timeout)
+                elif wake.wait(timeout):
+                    wake.clear()
+                continue
+
+            leased = {word: (word_id, attempts) for word_id, word, attempts, _ in jobs}
+            refresh = {word for _, word, _, fresh in jobs if fresh}
+            finished: set[str] = set()
+            try:
+                for word, meaning, err in self._generate_words(
+                    list(leased), workers, size, refresh
+                ):
+                    word_id, attempts = leased[word]
+                    if err is None:
+                        try:
+                            self.db.complete_job(word_id, meaning, *self._provenance())
+                        except AppError as e:
+                            err = e
+                    if err is not None:
+                        delay = backoff_delay(
+                            attempts,
+                            settings.queue_retry_base_delay,
+                            settings.queue_retry_max_delay,
+                        )
+                        self.db.fail_job(word_id, str(err), time.time() + delay)
+                    finished.add(word)
+                    yield word, err
+            finally:
+                unfinished = [leased[w][0] for w in leased if w not in finished]
+                if unfinished:
+                    self.db.release_jobs(unfinished)
+
+    def enqueue_regen(
+        self,
+        min_id: int | None = None,
+        max_id: int | None = None,
+        before: str | None = None,
+        model: str | None = None,
+        force: bool = False,
+        include_manual: bool = False,
+    ) -> int:
+        """将符合条件的词语加入生成队列以重新生成词义，返回新加入的任务数。
+
+        - 默认跳过已由当前模型与提示词生成的词语，中断后以相同条件再次运行即从中断处继续；
+          `force` 为 True 时一并重新生成，且生成时不读取响应缓存
+        - 默认跳过手动设置或导入的词语，`include_manual` 为 True 时一并重新生成
+        """
+        return self.db.enqueue_regen(
+            min_id,
+            max_id,
+            before,
+            model,
+            None if force else self._provenance(),
+            force,
+            include_manual,
+        )
+
+    def queue_status(self) -> tuple[int, list[tuple[str, int, str]]]:
+        """返回 `(待处理任务数, [(词语, 尝试次数, 最后的错误)])`，后者为不再重试的任务。"""
+        return self.db.queue_status(self.settings.queue_max_attempts)
+
+    def retry_failed_jobs(self) -> int:
+        """让不再重试的任务重新进入队列，返回任务数。"""
+        return self.db.reset_failed_jobs(self.settings.queue_max_attempts)
+
+    def _sync_changes(
+        self, source: DictDataBase, target: DictDataBase
+    ) -> tuple[int, int]:
+        """将 `source` 上次同步之后的修改应用到 `target`，返回 `(写入数, 删除数)`。
+
+        - 每批修改与同步序号在同一个事务中写入，中断后再次同步即从中断处继续
+        """
+        source_id = source.database_id()
+        written = deleted = 0
+        for batch in itertools.batched(
+            source.iter_changes(
+                target.sync_watermark(source_id), self.settings.sync_batch_size
+            ),
+            self.settings.sync_batch_size,
+        ):
+            w, d = target.apply_changes(source_id, batch)
+            written += w
+            deleted += d
+        return written, deleted
+
+    def sync(
+        self, source: str, target: str | None = None
+    ) -> list[tuple[str, str, int, int]]:
+        """双向增量同步两个数据库，`target` 为 None 时与本地词库同步。
+
+        - 先将 `source` 的修改同步到 `target`，再反向同步
+        - 返回每个方向的 `(源路径, 目标路径, 写入数, 删除数)`
+        """
+        target_path = target or self.settings.db_path
+        opened: list[DictDataBase] = []
+        try:
+            a = self._open_db(source)
+            opened.append(a)
+            if target is None:
+                b = self.db
+            else:
+                b = self._open_db(target)
+                opened.append(b)
+            if a.database_id() == b.database_id():
+                raise DictError("cannot sync a database with itself")
+            return [
+                (source, target_path, *self._sync_changes(a, b)),
+                (target_path, source, *self._sync_changes(b, a)),
+            ]
+        finally:
+            for db in opened:
+                db.close()
+
+    def import_words(
+        self, entries: Iterable[tuple[str, str | None]], chunk_size: int | None = None
+    ) -> Iterator[tuple[int, int, list[str]]]:
+        """分块流式导入词条，每处理一块返回 `(写入数, 跳过数, 待生成词语)`。
+
+        - 每块只做一次集合查询以跳过已存在的词语，已带词义的词条在单个事务中写入
+        - 未带词义的词语不会写入，由调用方通过 `add_words` 生成释义
+        """
+        size = chunk_size or self.settings.import_chunk_size
+        for chunk in itertools.batched(entries, size):
+            existing = self.db.existing_words([w for w, _ in chunk])
+            ready = [(w, m) for w, m in chunk if w not in existing and m is not None]
+            existing.update(w for w, _ in ready)
+            pending = list(dict.fromkeys(w for w, _ in chunk if w not in existing))
+            inserted = self.db.insert_words(ready) if ready else 0
+            yield inserted, len(chunk) - inserted - len(pending), pending
+
+    def export_words(
+        self,
+        min_id: int | None = None,
+        max_id: int | None = None,
+        since: str | None = None,
+    ) -> Iterator[tuple[str, str, str, str]]:
+        """按 id 升序逐行返回待导出的 `(词语, 词义, 创建时间, 更新时间)`。"""
+        return self.db.iter_words(
+            min_id, max_id, since, self.settings.export_batch_size
+        )
 
     def delete_word(self, word: str) -> None:
         """删除指定词语。"""
@@ -74,17 +832,148 @@ class Dict:
         self.db.update_word(word, meaning)
 
     def query_word(self, word: str) -> WordTable | None:
-        """查询指定词语，返回表记录或 None。"""
-        return self.db.query_word(word)
+        """查询指定词语，返回表记录或 None；存在有效快照时直接在快照中查找。"""
+        snap = self._get_snapshot()
+        if snap is None:
+            return self.db.query_word(word)
+        with tracing.span("snapshot.lookup"):
+            meaning = snap.lookup(word)
+        return WordTable(word, meaning) if meaning is not None else None
+
+    def query_words(self, words: list[str]) -> tuple[list[WordTable], list[str]]:
+        """批量查询词语，按输入顺序返回 `(命中的词条, 缺失的词语)`。"""
+        snap = self._get_snapshot()
+        if snap is None:
+            return self.db.query_words(words)
+        found: list[WordTable] = []
+        missing: list[str] = []
+        with tracing.span("snapshot.lookup", words=len(words)):
+            for w in dict.fromkeys(words):
+                meaning = snap.lookup(w)
+                if meaning is None:
+                    missing.append(w)
+                else:
+                    found.append(WordTable(w, meaning))
+        return found, missing
+
+    def query_random(
+        self, count: int, seed: int | None = None, weighted: bool = False
+    ) -> list[WordTable]:
+        """随机查询指定数量的词语，给定 `seed` 时结果可复现。
+
+        - `weighted` 为 True 时按复习记录加权，答错越多的词语越容易被抽中
+        """
+        return self.db.query_random(count, random.Random(seed), weighted)
 
-    def query_random(self, count: int) -> list[WordTable]:
-        """随机查询指定数量的词语。"""
-        return self.db.query_random(count)
+    def mark_words(self, words: list[str], correct: bool) -> None:
+        """记录词语的复习结果（答对或答错），用于加权抽取。"""
+        self.db.record_reviews(list(dict.fromkeys(words)), correct)
 
-    def query_range(self, start: int, end: int) -> list[WordTable]:
-        """查询指定位置范围内的词语（按 id 升序）。"""
-        return self.db.query_range(start, end)
+    def iter_range(
+        self, start: int, end: int, save_cursor: bool = False
+    ) -> Iterator[WordTable]:
+        """按 id 升序逐个返回指定位置范围内的词条，存在有效快照时按位置直接读取。
+
+        - `save_cursor` 为 True 时将阅读游标移到最后返回的词条，之后 `iter_next` 从此处继续
+        """
+        snap = self._get_snapshot()
+        if snap is None:
+            rows = self.db.iter_range(start, end, self.settings.query_batch_size)
+        else:
+            rows = snap.range(start, end)
+        return self._iter_reading(rows, save_cursor)
+
+    def _iter_reading(
+        self, rows: Iterable[tuple[int, str, str]], save_cursor: bool
+    ) -> Iterator[WordTable]:
+        """将 `(id, 词语, 词义)` 逐个转换为词条，需要时在读取结束或提前停止时记录阅读游标。"""
+        if not save_cursor:
+            for _, word, meaning in rows:
+                yield WordTable(word, meaning)
+            return
+        last_id = None
+        try:
+            for last_id, word, meaning in rows:
+                yield WordTable(word, meaning)
+        finally:
+            if last_id is not None:
+                self._save_cursor(last_id)
+
+    def _load_cursor(self) -> int:
+        """读取阅读游标（最后读取的 id），从未记录时为 0。"""
+        try:
+            with open(self.settings.cursor_path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _save_cursor(self, last_id: int) -> None:
+        """将阅读游标原子地写入状态文件，不写入数据库，读取词库的命令无需获取写锁。"""
+        path = self.settings.cursor_path
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(str(last_id))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            raise DictError(f"save reading cursor fail: {e}") from e
+
+    def search(self, terms: list[str], limit: int) -> list[WordTable]:
+        """在词语与词义中全文检索，按相关度返回至多 `limit` 条。"""
+        return self.db.search(terms, limit)
+
+    def iter_next(self, count: int) -> Iterator[WordTable]:
+        """从上次阅读的位置继续逐个返回至多 `count` 个词条并推进阅读游标，存在有效快照时直接读取。"""
+        last_id = self._load_cursor()
+        snap = self._get_snapshot()
+        if snap is None:
+            rows = self.db.iter_after(last_id, count, self.settings.query_batch_size)
+        else:
+            rows = snap.after(last_id, count)
+        return self._iter_reading(rows, True)
+
+    def cache_stats(self) -> dict[str, int]:
+        """返回响应缓存的条数与命中、未命中次数。"""
+        cache = self._get_cache()
+        if cache is None:
+            raise DictError("response cache is disabled")
+        return cache.stats()
+
+    def clear_cache(self) -> None:
+        """清空响应缓存。"""
+        cache = self._get_cache()
+        if cache is None:
+            raise DictError("response cache is disabled")
+        cache.clear()
+
+    def interrupt(self) -> None:
+        """中断进行中的生成：不再发出或重试请求，并关闭接口客户端以终止进行中的请求。
+
+        - 下次生成时重新创建客户端
+        """
+        self._stop.set()
+        with self._client_lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
 
     def close_db(self) -> None:
-        """关闭数据库连接。"""
-        self.db.close()
+        """关闭接口客户端、响应缓存、快照与数据库连接。"""
+        try:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+        finally:
+            try:
+                if self._cache is not None:
+                    self._cache.close()
+                    self._cache = None
+            finally:
+                if self._snapshot is not None:
+                    self._snapshot.close()
+                    self._snapshot = None
+                    self._snapshot_key = None
+                if self._db is not None:
+                    self._db.close()
+                    self._db = None
@@ -39,6 +39,30 @@ class ParseUserInputError(AppError):
         self.err = err
 
 
+class ParseImportFileError(AppError):
+    def __init__(self, err: Exception | str) -> None:
+        super().__init__(f"parse import file fail: {err}")
+        self.err = err
+
+
+class WriteExportFileError(AppError):
+    def __init__(self, err: Exception | str) -> None:
+        super().__init__(f"write export file fail: {err}")
+        self.err = err
+
+
+class SnapshotError(AppError):
+    def __init__(self, err: Exception | str) -> None:
+        super().__init__(f"snapshot operation fail: {err}")
+        self.err = err
+
+
+class DaemonError(AppError):
+    def __init__(self, err: Exception | str) -> None:
+        super().__init__(f"daemon operation fail: {err}")
+        self.err = err
+
+
 class DatabaseError(AppError):
     def __init__(self, err: Exception | str) -> None:
         super().__init__(f"database operation fail: {err}")
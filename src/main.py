@@ -1,83 +1,68 @@
+"""命令行入口。
+
+常驻进程运行时只需标准库与 `daemon` 即可转发命令，不导入词典、数据库与输出等模块，
+也不解析参数；需要在本地执行时才导入 `app`。
+"""
+
+import os
 import sys
 from typing import Any
 
-from cli import get_user_input
-from tool import render_table
-
+import daemon
 from err import AppError, UserInterruptError
-from settings import Settings
-from dict import Dict
-
-
-class App:
-    def __init__(self, argv: Any | None = None) -> None:
-        self.user_input = get_user_input(argv)
-        self.settings = Settings()
-        self.dict = Dict(self.settings)
-
-    def run(self) -> None:
-        match self.user_input.op:
-            case "add":
-                self._run_add()
-            case "del":
-                self._run_del()
-            case "set":
-                self._run_set()
-            case "get":
-                self._run_get()
-            case "pick":
-                self._run_pick()
-            case "range":
-                self._run_range()
-
-    def _run_add(self) -> None:
-        for w in self.user_input.add.words:
-            self.dict.add_word(w)
-            print(f"Add {w} success.")
-
-    def _run_del(self) -> None:
-        for w in self.user_input.delete.words:
-            self.dict.delete_word(w)
-            print(f"Delete {w} success.")
-
-    def _run_set(self) -> None:
-        self.dict.update_word(self.user_input.set.word, self.user_input.set.meaning)
-        print("Set success.")
-
-    def _run_get(self) -> None:
-        word_meanings = []
-        for w in self.user_input.get.words:
-            wm = self.dict.query_word(w)
-            if wm:
-                word_meanings.append(wm)
-        if word_meanings:
-            print(render_table(word_meanings))
-        else:
-            print("No result.")
-
-    def _run_pick(self) -> None:
-        word_meanings = self.dict.query_random(self.user_input.pick.count)
-        if word_meanings:
-            print(render_table(word_meanings))
-        else:
-            print("No result.")
-
-    def _run_range(self) -> None:
-        word_meanings = self.dict.query_range(
-            self.user_input.range.start, self.user_input.range.end
-        )
-        if word_meanings:
-            print(render_table(word_meanings))
-        else:
-            print("No result.")
-
-    def close(self) -> None:
-        self.dict.close_db()
+
+# 始终在本地执行的命令：
+# - shell、serve 需要终端交互或自身就是常驻进程
+# - export 在本地执行，避免常驻进程在内存中缓冲全部输出
+# - import、worker、regen 可能长时间请求接口生成释义；常驻进程逐个处理请求，
+#   在本地执行以免阻塞其他命令，常驻进程的后台线程也会参与处理生成队列
+# - sync 在本地执行，词库路径按当前目录解析
+_LOCAL_COMMANDS = frozenset(
+    {"shell", "serve", "export", "import", "worker", "regen", "sync"}
+)
+
+# 出现任一参数时在本地执行：帮助与版本信息，以及只针对本地执行的耗时统计
+_LOCAL_FLAGS = frozenset({"-h", "--help", "--version", "--profile"})
+
+
+def _runs_locally(argv: list[str]) -> bool:
+    """不完整解析参数，按命令名与少数选项判断命令是否须在本地执行。
+
+    - add 须请求接口生成释义，只有 add --defer 交给常驻进程
+    - 参数有误时交给常驻进程，其错误输出与本地执行一致
+    """
+    if _LOCAL_FLAGS.intersection(argv):
+        return True
+    rest = iter(argv)
+    op = next((a for a in rest if not a.startswith("-")), None)
+    if op is None or op in _LOCAL_COMMANDS:
+        return True
+    if op == "add":
+        return "--defer" not in rest
+    return False
+
+
+def _forward(argv: list[str]) -> int | None:
+    """常驻进程运行时将命令转发给它，返回退出码；需要在本地执行时返回 None。
+
+    - 设置了 KGDICT_NO_DAEMON 或启用耗时追踪（KGDICT_TRACE）时在本地执行
+    """
+    if os.getenv("KGDICT_NO_DAEMON") or os.getenv("KGDICT_TRACE"):
+        return None
+    if _runs_locally(argv):
+        return None
+    return daemon.forward(daemon.default_socket_path(), argv)
 
 
 def main(argv: Any | None = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
     app = None
     try:
+        code = _forward(argv)
+        if code is not None:
+            return code
+        from app import App
+
         app = App(argv)
         app.run()
     except UserInterruptError:
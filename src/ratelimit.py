@@ -0,0 +1,161 @@
+"""接口速率限制模块。
+
+以令牌桶分别限制每分钟请求数与 token 数，并按接口反馈自适应调整（AIMD）：收到 429 时
+将速率减半并暂停到 `Retry-After` 指定的时刻，请求成功后逐步恢复，从而在服务商的限额下
+保持尽可能高的持续吞吐。未配置上限时不限速，首次收到 429 后以近一分钟的实际请求速率为
+基准开始限速。重试的等待时间为带随机抖动的指数退避，并遵循 `Retry-After`。
+"""
+
+import email.utils
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Mapping
+
+# 收到 429 后速率乘以该系数
+_DECREASE = 0.5
+# 每次成功后速率增加基准速率（配置的上限，未设上限时为首次降速前的实际速率）的该比例
+_INCREASE = 0.05
+# 每分钟请求数或 token 数的下限，避免持续降速后停滞
+_MIN_RATE = 1.0
+# 两次降速之间的最短间隔（秒），并发请求同时收到的 429 只降速一次
+_DECREASE_COOLDOWN = 1.0
+# 估计实际请求速率时的最短统计时长（秒），避免刚启动时样本过少
+_MIN_WINDOW = 0.25
+
+
+class _Bucket:
+    """按速率排队的令牌桶，速率单位为每分钟，`rate` 为 None 时不限制。
+
+    - 记录下一个请求最早可发出的时刻，请求按速率均匀发出、不允许突发，
+      以免触发服务商按秒计的限额
+    """
+
+    def __init__(self, rate: float | None) -> None:
+        self.max_rate = rate
+        self.base_rate = rate
+        self.rate = rate
+        self.ready = 0.0
+
+    def interval(self, amount: float) -> float:
+        """按当前速率消耗 `amount` 个令牌所需的秒数。"""
+        return 0.0 if self.rate is None else amount * 60 / self.rate
+
+
+class RateLimiter:
+    """线程安全的自适应限速器。"""
+
+    def __init__(
+        self,
+        requests_per_minute: float | None,
+        tokens_per_minute: float | None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._clock = clock
+        self._sleep = sleep
+        self._requests = _Bucket(requests_per_minute)
+        self._tokens = _Bucket(tokens_per_minute)
+        self._recent: deque[float] = deque()
+        self._pause_until = 0.0
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def requests_per_minute(self) -> float | None:
+        """当前的请求速率上限（每分钟），None 表示不限制。"""
+        return self._requests.rate
+
+    def acquire(self, tokens: int = 0) -> float:
+        """等待直到可以发出一个预计消耗 `tokens` 个 token 的请求，返回等待的秒数。"""
+        with self._lock:
+            now = self._clock()
+            start = max(
+                now, self._pause_until, self._requests.ready, self._tokens.ready
+            )
+            self._requests.ready = start + self._requests.interval(1)
+            self._tokens.ready = start + self._tokens.interval(tokens)
+            self._recent.append(start)
+            while self._recent[0] < now - 60:
+                self._recent.popleft()
+        wait = start - now
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """请求完成后按实际 token 用量修正预留的额度。"""
+        with self._lock:
+            self._tokens.ready -= self._tokens.interval(estimated - actual)
+
+    def on_success(self) -> None:
+        """请求成功：逐步提高速率，直至配置的上限。"""
+        with self._lock:
+            for bucket in (self._requests, self._tokens):
+                if bucket.rate is None:
+                    continue
+                rate = bucket.rate + (bucket.base_rate or bucket.rate) * _INCREASE
+                if bucket.max_rate is not None:
+                    rate = min(rate, bucket.max_rate)
+                bucket.rate = rate
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        """收到 429：降低速率，并让所有请求暂停到 `retry_after` 秒之后。"""
+        with self._lock:
+            now = self._clock()
+            if retry_after:
+                self._pause_until = max(self._pause_until, now + retry_after)
+            if now < self._cooldown_until:
+                return
+            self._cooldown_until = now + max(_DECREASE_COOLDOWN, retry_after or 0)
+            if self._requests.rate is None:
+                # 未设上限时以近一分钟的实际请求速率为基准
+                window = (
+                    min(60.0, max(_MIN_WINDOW, now - self._recent[0]))
+                    if self._recent
+                    else 60.0
+                )
+                self._requests.base_rate = len(self._recent) * 60 / window
+                self._requests.rate = self._requests.base_rate
+            for bucket in (self._requests, self._tokens):
+                if bucket.rate is not None:
+                    bucket.rate = max(_MIN_RATE, bucket.rate * _DECREASE)
+
+
+def parse_retry_after(headers: Mapping[str, str] | None) -> float | None:
+    """从响应头中解析需要等待的秒数，支持 `retry-after-ms`、秒数与 HTTP 日期。"""
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(
+    attempt: int,
+    base: float,
+    cap: float,
+    retry_after: float | None = None,
+    rng: random.Random | None = None,
+) -> float:
+    """第 `attempt` 次（从 0 开始）重试前的等待秒数：全抖动指数退避，且不短于 `retry_after`。"""
+    delay = (rng or random).uniform(0, min(cap, base * 2**attempt))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
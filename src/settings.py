@@ -1,6 +1,7 @@
 """配置模块。
 
 从环境变量加载 API Key，定义调用大模型与数据库的相关配置。
+API Key 在首次使用时才解析，只读命令无需设置。
 """
 
 import os
@@ -12,19 +13,105 @@ from err import ParseApiKeyError
 class Settings:
     def __init__(self) -> None:
         # deepseek api 设置
-        self.api_key = self._get_api_key()
+        self._api_key: str | None = None
         self.base_url = "https://api.deepseek.com"
         self.temperature = 0.2
         self.model = "deepseek-chat"
         self.system_prompt = (
             "你是词语字典，用户输入词语，你给出释义，要求返回的内容中不能有释义这两个字"
         )
+        # 批量生成时追加在系统提示词之后
+        self.batch_prompt = (
+            "用户会以 JSON 数组一次给出多个词语，请为每个词语给出释义，"
+            "只返回一个 JSON 对象，键为词语原文，值为该词语的释义"
+        )
+
+        # 并发设置：批量生成释义时同时进行的请求数
+        self.max_workers = 8
+        # 每次请求合并生成的词语数，1 表示逐个请求
+        self.batch_size = 1
+
+        # HTTP 连接池设置：客户端在多次请求间复用连接（单位：秒）
+        self.max_connections = 16
+        self.max_keepalive_connections = 8
+        self.keepalive_expiry = 30.0
+        self.timeout = 60.0
+        self.connect_timeout = 10.0
+
+        # 限速设置：每分钟的请求数与 token 数上限，None 表示不限制；
+        # 收到 429 时自动降速，请求成功后逐步恢复到上限
+        self.requests_per_minute: float | None = None
+        self.tokens_per_minute: float | None = None
+        # 每个词语预计输出的 token 数，用于请求前预留 token 额度
+        self.estimated_completion_tokens = 150
+        # 重试设置：429、超时、连接错误与 5xx 按指数退避（带随机抖动）重试，
+        # 遵循响应中的 Retry-After（单位：秒）
+        self.max_retries = 6
+        self.retry_base_delay = 0.5
+        self.retry_max_delay = 60.0
+
+        # 后台生成队列设置（单位：秒）：worker 领取的任务在租约期内未完成视为中断，
+        # 可被其他 worker 重新领取；失败的任务按指数退避重试，达到最大次数后不再重试
+        self.queue_lease_seconds = 300.0
+        self.queue_max_attempts = 5
+        self.queue_retry_base_delay = 10.0
+        self.queue_retry_max_delay = 600.0
+        # worker 等待新任务时的轮询间隔
+        self.queue_poll_interval = 5.0
 
         # 数据库设置
         self._db_dir = os.getenv("APPDATA") or os.path.join(
             os.path.expanduser("~"), ".kgdict"
         )
         self.db_path = os.path.join(self._db_dir, "kgdict.db")
+        # SQLite 连接参数：WAL 模式下读写互不阻塞，NORMAL 同步级别在提交时不再等待落盘；
+        # cache_size 为负数时单位为 KiB；busy_timeout 为等待其他进程释放写锁的毫秒数
+        self.db_journal_mode = "wal"
+        self.db_synchronous = "normal"
+        self.db_cache_size = -16_000
+        self.db_mmap_size = 256 * 1024 * 1024
+        self.db_busy_timeout = 5000
+        # 每个连接缓存的预编译语句数
+        self.db_cached_statements = 256
+        # 批量导入时每个事务写入的词条数
+        self.import_chunk_size = 1000
+        # 导出时每次从数据库读取的行数
+        self.export_batch_size = 1000
+        # range 逐行输出时每次从数据库读取的行数
+        self.query_batch_size = 1000
+        # 同步时每个事务应用的修改数
+        self.sync_batch_size = 1000
+        # 只读快照：由 `kgdict compile` 生成，与数据库一致时查询直接读取快照
+        self.snapshot_path = os.path.join(self._db_dir, "kgdict.snap")
+        self.use_snapshot = True
+        # 阅读游标：range --next 从记录的位置继续，保存在数据库之外，读取词库无需写入数据库
+        self.cursor_path = os.path.join(self._db_dir, "kgdict.cursor")
+
+        # 常驻进程监听的 Unix 套接字（命令行转发时由 daemon.default_socket_path 得到同一路径）；
+        # 设置环境变量 KGDICT_NO_DAEMON 可禁止转发
+        self.socket_path = os.path.join(self._db_dir, "kgdict.sock")
+
+        # 设置环境变量 KGDICT_TRACE 为文件路径时，以 JSON Lines 追加写入各阶段耗时
+        self.trace_path = os.getenv("KGDICT_TRACE") or None
+
+        # 交互模式的命令历史文件
+        self.history_path = os.path.join(self._db_dir, "history")
+
+        # 显示设置：range 超过该行数时以固定列宽逐行输出表格
+        self.stream_rows = 1000
+
+        # 响应缓存设置：相同接口配置下重复生成的词语直接读取本地缓存
+        self.cache_enabled = True
+        self.cache_path = os.path.join(self._db_dir, "cache.db")
+        self.cache_max_entries = 100_000
+        self.cache_max_age_days = 180
+
+    @property
+    def api_key(self) -> str:
+        """API Key，首次访问时从环境变量解析。"""
+        if self._api_key is None:
+            self._api_key = self._get_api_key()
+        return self._api_key
 
     def _get_api_key(self) -> str:
         """从环境变量读取 API Key，若缺失则抛出 `ParseApiKeyError`。"""
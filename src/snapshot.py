@@ -0,0 +1,235 @@
+"""只读词库快照模块。
+
+`kgdict compile` 将词表编译为紧凑的二进制文件，查询时以 mmap 映射后直接在文件上二分查找，
+启动时只读取固定长度的文件头，无需打开 SQLite。文件结构（小端序）：
+
+- 文件头 `_HEADER`：魔数、版本、词条数、词库修改计数、字符串表长度与数据库文件状态
+- 记录表：按 id 升序，每条为 `_RECORD`（id、词语与词义在字符串表中的偏移与长度）
+- 排序索引：按词语 UTF-8 字节序（与 SQLite 默认的 BINARY 排序一致）排列，每项为 `_INDEX`
+  （词语偏移、词语长度与记录下标），二分查找的每一步只需读取一项
+- 字符串表：UTF-8 编码的词语与词义
+
+失效判断：文件头记录编译时数据库与 WAL 文件的大小和修改时间（`fingerprint`）。两者一致时快照
+一定有效；不一致时由调用方比较数据库中的修改计数，计数未变则通过 `stamp` 更新文件状态。
+"""
+
+import bisect
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+
+from err import SnapshotError
+
+_MAGIC = b"KGDS"
+_VERSION = 1
+
+# 魔数、版本、词条数、保留字段、修改计数、字符串表长度、数据库与 WAL 的大小和修改时间
+_HEADER = struct.Struct("<4sIIIQQqqqq")
+_FINGERPRINT_OFFSET = 32
+_FINGERPRINT = struct.Struct("<qqqq")
+# id、词语偏移、词语长度、词义偏移、词义长度
+_RECORD = struct.Struct("<IIIII")
+# 词语偏移、词语长度、记录下标
+_INDEX = struct.Struct("<III")
+
+# 字符串表使用 32 位偏移
+_MAX_STRINGS_SIZE = 2**32 - 1
+
+Fingerprint = tuple[int, int, int, int]
+
+
+def fingerprint(db_path: str) -> Fingerprint:
+    """返回数据库与 WAL 文件的 `(大小, 修改时间)`，文件不存在或 WAL 为空时记为 0。"""
+    try:
+        st = os.stat(db_path)
+        db = (st.st_size, st.st_mtime_ns)
+    except OSError:
+        db = (0, 0)
+    try:
+        st = os.stat(db_path + "-wal")
+        wal = (st.st_size, st.st_mtime_ns) if st.st_size else (0, 0)
+    except OSError:
+        wal = (0, 0)
+    return (*db, *wal)
+
+
+def file_id(path: str) -> tuple[int, int] | None:
+    """返回文件的 `(设备号, inode)`，用于发现快照被重新编译替换，文件不存在时返回 None。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def write(
+    path: str,
+    count: int,
+    rows: Iterable[tuple[int, str, str]],
+    ids_by_word: Callable[[], Iterable[int]],
+    generation: int,
+    db_fingerprint: Fingerprint,
+) -> None:
+    """编译快照并原子地替换 `path`。
+
+    - `rows` 按 id 升序给出 `count` 条 `(id, 词语, 词义)`，字符串直接写入文件
+    - `ids_by_word` 在 `rows` 读取完后调用，按词语字节序给出全部 id
+    """
+    records = bytearray(count * _RECORD.size)
+    ids = array("Q")
+    strings_offset = _HEADER.size + count * (_RECORD.size + _INDEX.size)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.seek(strings_offset)
+            size = 0
+            for i, (id_, word, meaning) in enumerate(rows):
+                if i >= count:
+                    raise SnapshotError("database changed while compiling")
+                word_bytes = word.encode("utf-8")
+                meaning_bytes = meaning.encode("utf-8")
+                if size + len(word_bytes) + len(meaning_bytes) > _MAX_STRINGS_SIZE:
+                    raise SnapshotError("dictionary is too large for snapshot")
+                _RECORD.pack_into(
+                    records,
+                    i * _RECORD.size,
+                    id_,
+                    size,
+                    len(word_bytes),
+                    size + len(word_bytes),
+                    len(meaning_bytes),
+                )
+                f.write(word_bytes)
+                f.write(meaning_bytes)
+                size += len(word_bytes) + len(meaning_bytes)
+                ids.append(id_)
+            if len(ids) != count:
+                raise SnapshotError("database changed while compiling")
+
+            # 记录按 id 升序排列，二分查找即可由 id 得到记录下标
+            index = bytearray(count * _INDEX.size)
+            for i, id_ in enumerate(ids_by_word()):
+                record = bisect.bisect_left(ids, id_)
+                _, word_off, word_len, _, _ = _RECORD.unpack_from(
+                    records, record * _RECORD.size
+                )
+                _INDEX.pack_into(index, i * _INDEX.size, word_off, word_len, record)
+
+            f.seek(0)
+            f.write(
+                _HEADER.pack(
+                    _MAGIC, _VERSION, count, 0, generation, size, *db_fingerprint
+                )
+            )
+            f.write(records)
+            f.write(index)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        raise SnapshotError(e) from e
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+class Snapshot:
+    """映射到内存的只读快照。"""
+
+    def __init__(self, path: str, file: mmap.mmap) -> None:
+        self.path = path
+        self._mm = file
+        (
+            _,
+            _,
+            self.count,
+            _,
+            self.generation,
+            _,
+            *fp,
+        ) = _HEADER.unpack_from(file, 0)
+        self.fingerprint: Fingerprint = tuple(fp)
+        self._records = _HEADER.size
+        self._index = self._records + self.count * _RECORD.size
+        self._strings = self._index + self.count * _INDEX.size
+
+    @classmethod
+    def open(cls, path: str) -> "Snapshot | None":
+        """打开并校验快照，文件不存在或格式不符时返回 None。"""
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mm) >= _HEADER.size:
+            magic, version, count, _, _, strings_size, *_ = _HEADER.unpack_from(mm, 0)
+            expected = (
+                _HEADER.size + count * (_RECORD.size + _INDEX.size) + strings_size
+            )
+            if magic == _MAGIC and version == _VERSION and len(mm) == expected:
+                return cls(path, mm)
+        mm.close()
+        return None
+
+    def _record(self, i: int) -> tuple[int, str, str]:
+        id_, word_off, word_len, meaning_off, meaning_len = _RECORD.unpack_from(
+            self._mm, self._records + i * _RECORD.size
+        )
+        base = self._strings
+        return (
+            id_,
+            self._mm[base + word_off : base + word_off + word_len].decode("utf-8"),
+            self._mm[base + meaning_off : base + meaning_off + meaning_len].decode(
+                "utf-8"
+            ),
+        )
+
+    def _id(self, i: int) -> int:
+        return _RECORD.unpack_from(self._mm, self._records + i * _RECORD.size)[0]
+
+    def lookup(self, word: str) -> str | None:
+        """二分查找词语，返回词义，不存在时返回 None。"""
+        key = word.encode("utf-8")
+        mm, index, strings = self._mm, self._index, self._strings
+        unpack_from, size = _INDEX.unpack_from, _INDEX.size
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            word_off, word_len, _ = unpack_from(mm, index + mid * size)
+            start = strings + word_off
+            if mm[start : start + word_len] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.count:
+            return None
+        word_off, word_len, record = unpack_from(mm, index + lo * size)
+        start = strings + word_off
+        if mm[start : start + word_len] != key:
+            return None
+        return self._record(record)[2]
+
+    def range(self, start: int, end: int) -> Iterator[tuple[int, str, str]]:
+        """按 id 升序返回位置闭区间 [start, end] 的 `(id, 词语, 词义)`。"""
+        for i in range(max(1, start) - 1, min(end, self.count)):
+            yield self._record(i)
+
+    def after(self, last_id: int, count: int) -> Iterator[tuple[int, str, str]]:
+        """按 id 升序返回 id 大于 `last_id` 的至多 `count` 个 `(id, 词语, 词义)`。"""
+        start = bisect.bisect_right(range(self.count), last_id, key=self._id)
+        for i in range(start, min(start + count, self.count)):
+            yield self._record(i)
+
+    def stamp(self, db_fingerprint: Fingerprint) -> None:
+        """确认快照仍与数据库一致后，更新文件头中的数据库文件状态。"""
+        self.fingerprint = db_fingerprint
+        try:
+            with open(self.path, "r+b") as f:
+                f.seek(_FINGERPRINT_OFFSET)
+                f.write(_FINGERPRINT.pack(*db_fingerprint))
+        except OSError:
+            # 无法写入时只影响下次启动的判断速度
+            pass
+
+    def close(self) -> None:
+        self._mm.close()
@@ -1,149 +1,162 @@
 """显示与排版工具。
 
-提供表格渲染函数，考虑中日韩字符宽度与多行换行显示。
+提供表格渲染函数，考虑中日韩字符宽度与多行换行显示，并支持 plain、TSV、JSON Lines
+等便于管道处理的输出格式。所有格式均逐行生成，可直接消费行迭代器：表格在给定固定列宽时
+无需预先读取全部行，输出可立即开始且内存占用恒定。
 """
 
-from collections.abc import Sequence
-from db import WordTable
+import json
 import unicodedata
+from collections.abc import Iterable, Iterator, Sequence
+from functools import cache
 
+from dataio import escape_tsv
+from db import WordTable
 
-def render_table(rows: list[WordTable]) -> str:
-    """将 `WordTable` 列表渲染为等宽字符表格字符串。"""
-    # Materialize rows for inspection
-    rows_list = list(rows)
-    if not rows_list:
-        return ""
-
-    headers = ("词语", "词义")
-
-    # Simplified: rows are list[WordTable], headers are ("词语", "词义")
-    header_names: tuple[str, ...] = tuple(str(h) for h in headers)
-    num_cols = len(header_names)
-    normalized: list[tuple[str, ...]] = [
-        (str(obj.word), str(obj.meaning)) for obj in rows_list
+OUTPUT_FORMATS = ("table", "plain", "tsv", "jsonl")
+
+_HEADERS = ("词语", "词义")
+
+# 每列的最大显示宽度：[词语, 词义]
+_COL_CAPS = (20, 80)
+
+
+@cache
+def _char_width(ch: str) -> int:
+    # Treat fullwidth and wide as width 2; combining marks as 0
+    if unicodedata.combining(ch):
+        return 0
+    eaw = unicodedata.east_asian_width(ch)
+    return 2 if eaw in ("W", "F") else 1
+
+
+def _display_width(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    return sum(map(_char_width, text))
+
+
+def _wrap_display(text: str, max_width: int) -> list[tuple[str, int]]:
+    """按显示宽度换行（中日韩字符宽度为 2），返回 `(片段, 片段宽度)` 列表。"""
+    if max_width <= 0:
+        return [(text, _display_width(text))]
+    if text.isascii() and len(text) <= max_width:
+        return [(text, len(text))]
+    line: list[str] = []
+    width = 0
+    lines: list[tuple[str, int]] = []
+    for ch in text:
+        w = _char_width(ch)
+        if width + w > max_width and line:
+            lines.append(("".join(line), width))
+            line = [ch]
+            width = w
+        else:
+            line.append(ch)
+            width += w
+    if line:
+        lines.append(("".join(line), width))
+    return lines or [("", 0)]
+
+
+def _wrap_row(row: WordTable) -> list[list[tuple[str, int]]]:
+    return [
+        _wrap_display(str(row.word), _COL_CAPS[0]),
+        _wrap_display(str(row.meaning), _COL_CAPS[1]),
     ]
 
-    data = [header_names] + normalized
-    if not data:
-        return ""
-
-    def _char_width(ch: str) -> int:
-        # Treat fullwidth and wide as width 2; combining marks as 0
-        if unicodedata.combining(ch):
-            return 0
-        eaw = unicodedata.east_asian_width(ch)
-        return 2 if eaw in ("W", "F") else 1
-
-    def _display_width(text: str) -> int:
-        return sum(_char_width(ch) for ch in text)
-
-    def _wrap_display(text: str, max_width: int) -> list[str]:
-        # Wrap text by display width (counts CJK as width 2)
-        if max_width <= 0:
-            return [text]
-        line: list[str] = []
-        width = 0
-        lines: list[str] = []
-        for ch in text:
-            w = _char_width(ch)
-            if width + w > max_width and line:
-                lines.append("".join(line))
-                line = [ch]
-                width = w
-            else:
-                line.append(ch)
-                width += w
-        if line:
-            lines.append("".join(line))
-        return lines or [""]
-
-    num_cols = len(data[0])
-    # Set reasonable max width per column (display width)
-    # Heuristic: if 2 columns, assume [word, meaning]
-    default_caps = [30] * num_cols
-    if num_cols == 2:
-        default_caps = [20, 80]
-    col_caps = default_caps
-
-    # Prepare wrapped body (exclude header)
-    header = list(data[0])
-    body = data[1:]
-
-    # Wrap cells per column caps
-    wrapped_body: list[list[list[str]]] = []
-    for row in body:
-        wrapped_row: list[list[str]] = []
-        for i, cell in enumerate(row):
-            cap = col_caps[i] if i < len(col_caps) else 30
-            wrapped_row.append(_wrap_display(cell, cap))
-        wrapped_body.append(wrapped_row)
-
-    # Compute column widths from header and wrapped body
-    col_widths = [0] * num_cols
-    for i in range(num_cols):
-        col_widths[i] = max(col_widths[i], _display_width(header[i]))
-    for wrapped_row in wrapped_body:
-        for i in range(num_cols):
-            for piece in wrapped_row[i]:
-                w = _display_width(piece)
-                if w > col_widths[i]:
-                    col_widths[i] = w
-
-    # Alignment per column: left align first column (词语) and others
-    col_align: list[str] = ["left"] * num_cols
-
-    def _pad_cell(text: str, width: int, align: str) -> str:
-        pad = width - _display_width(text)
-        if pad <= 0:
-            return text
-        if align == "center":
-            left = pad // 2
-            right = pad - left
-            return (" " * left) + text + (" " * right)
-        # default: left align
-        return text + (" " * pad)
-
-    def format_row(row: Sequence[str]) -> str:
-        padded_cells: list[str] = []
-        for i, cell in enumerate(row):
-            align = col_align[i] if i < len(col_align) else "left"
-            padded_cells.append(_pad_cell(cell, col_widths[i], align))
-        return "| " + " | ".join(padded_cells) + " |"
-
-    def sep_line() -> str:
-        # separator like +-----+-------+
-        parts = ["-" * (w + 2) for w in col_widths]
-        return "+" + "+".join(parts) + "+"
-
-    lines: list[str] = []
-    # top border
-    lines.append(sep_line())
-    # header
-    lines.append(format_row(header))
-    # header-data separator
-    lines.append(sep_line())
-    # data rows with separators between and wrapped lines
-    for wrapped_row in wrapped_body:
-        # Determine row height (max wrapped lines among columns)
-        row_height = max(len(pieces) for pieces in wrapped_row) if wrapped_row else 1
-        # Compute vertical top padding per column to achieve vertical centering for the first column
-        top_pads: list[int] = []
-        for i in range(num_cols):
-            pieces = wrapped_row[i]
-            if i == 0:
-                top_pads.append((row_height - len(pieces)) // 2)
-            else:
-                top_pads.append(0)
-        for line_idx in range(row_height):
-            line_cells: list[str] = []
-            for i in range(num_cols):
-                pieces = wrapped_row[i]
-                # Adjust line index by top padding
-                adj_idx = line_idx - top_pads[i]
-                cell_text = pieces[adj_idx] if 0 <= adj_idx < len(pieces) else ""
-                line_cells.append(cell_text)
-            lines.append(format_row(tuple(line_cells)))
-        # row separator after each data row
-        lines.append(sep_line())
-    return "\n".join(lines)
+
+def _sep_line(col_widths: Sequence[int]) -> str:
+    # separator like +-----+-------+
+    return "+" + "+".join("-" * (w + 2) for w in col_widths) + "+"
+
+
+def _format_row(cells: Sequence[tuple[str, int]], col_widths: Sequence[int]) -> str:
+    # left align every column; pad by the already measured display width
+    padded = [
+        text + " " * (width - w) if width > w else text
+        for (text, w), width in zip(cells, col_widths)
+    ]
+    return "| " + " | ".join(padded) + " |"
+
+
+def _iter_wrapped_row(
+    wrapped_row: list[list[tuple[str, int]]], col_widths: Sequence[int]
+) -> Iterator[str]:
+    # Determine row height (max wrapped lines among columns)
+    row_height = max(len(pieces) for pieces in wrapped_row)
+    # Vertically center the first column (词语), top-align the others
+    top_pads = [(row_height - len(wrapped_row[0])) // 2] + [0] * (len(wrapped_row) - 1)
+    for line_idx in range(row_height):
+        cells: list[tuple[str, int]] = []
+        for pieces, top in zip(wrapped_row, top_pads):
+            adj_idx = line_idx - top
+            cells.append(pieces[adj_idx] if 0 <= adj_idx < len(pieces) else ("", 0))
+        yield _format_row(cells, col_widths)
+
+
+def iter_table(
+    rows: Iterable[WordTable], col_widths: Sequence[int] | None = None
+) -> Iterator[str]:
+    """逐行生成等宽字符表格。
+
+    - 未给定 `col_widths` 时先读取全部行，以实际内容计算列宽
+    - 给定 `col_widths` 时按固定列宽逐行输出，不会预先读取行迭代器
+    """
+    if col_widths is None:
+        wrapped_body = [_wrap_row(row) for row in rows]
+        if not wrapped_body:
+            return
+        col_widths = [_display_width(h) for h in _HEADERS]
+        for wrapped_row in wrapped_body:
+            for i, pieces in enumerate(wrapped_row):
+                col_widths[i] = max(col_widths[i], *(w for _, w in pieces))
+        wrapped_rows: Iterable[list[list[tuple[str, int]]]] = wrapped_body
+    else:
+        wrapped_rows = map(_wrap_row, rows)
+
+    sep = _sep_line(col_widths)
+    header = [(h, _display_width(h)) for h in _HEADERS]
+    started = False
+    for wrapped_row in wrapped_rows:
+        if not started:
+            started = True
+            yield sep
+            yield _format_row(header, col_widths)
+            yield sep
+        yield from _iter_wrapped_row(wrapped_row, col_widths)
+        yield sep
+
+
+def iter_lines(
+    rows: Iterable[WordTable], fmt: str = "table", stream: bool = False
+) -> Iterator[str]:
+    """按输出格式逐行生成文本，`stream` 为真时表格使用固定列宽。
+
+    - table: 等宽字符表格
+    - plain: 每行 `词语：词义`
+    - tsv: 每行 `词语<TAB>词义`，字段经过转义，可被 `import` 原样读回
+    - jsonl: 每行一个 `{"word": ..., "meaning": ...}` 对象
+    """
+    match fmt:
+        case "plain":
+            return (f"{row.word}：{row.meaning}" for row in rows)
+        case "tsv":
+            return (
+                f"{escape_tsv(str(row.word))}\t{escape_tsv(str(row.meaning))}"
+                for row in rows
+            )
+        case "jsonl":
+            return (
+                json.dumps(
+                    {"word": row.word, "meaning": row.meaning}, ensure_ascii=False
+                )
+                for row in rows
+            )
+        case _:
+            return iter_table(rows, _COL_CAPS if stream else None)
+
+
+def render_table(rows: Iterable[WordTable]) -> str:
+    """将 `WordTable` 列表渲染为等宽字符表格字符串。"""
+    return "\n".join(iter_table(rows))
@@ -0,0 +1,149 @@
+"""耗时追踪模块。
+
+以区段（span）记录命令各阶段的耗时：参数解析、数据库打开、每次数据库调用、每次接口请求
+与结果渲染，接口请求同时记录词语与 token 用量。通过 `--profile` 在结束时输出汇总，
+或设置环境变量 `KGDICT_TRACE` 为文件路径，以 JSON Lines 追加写入每个区段。
+
+未启用时 `span` 与 `traced` 只做一次判断，不产生额外开销。
+"""
+
+import functools
+import json
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from typing import Any
+
+# 汇总中累加的用量字段
+_USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+_tracer: "Tracer | None" = None
+
+
+class Tracer:
+    """线程安全的区段记录器，时间以毫秒计并相对于创建时刻。"""
+
+    def __init__(self, origin: float | None = None) -> None:
+        self.origin = time.perf_counter() if origin is None else origin
+        self.spans: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(
+        self, name: str, start: float, duration: float, attrs: dict[str, Any]
+    ) -> None:
+        """记录一个区段，`start` 与 `duration` 为 `perf_counter` 的秒数。"""
+        record = {
+            "name": name,
+            "start_ms": round((start - self.origin) * 1000, 3),
+            "ms": round(duration * 1000, 3),
+            "thread": threading.current_thread().name,
+            **attrs,
+        }
+        with self._lock:
+            self.spans.append(record)
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+        """记录代码块的耗时，可向返回的字典中补充属性；出错时记录错误类型。"""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = type(e).__name__
+            raise
+        finally:
+            self.add(name, start, time.perf_counter() - start, attrs)
+
+    def summary(self) -> list[str]:
+        """按区段名称汇总次数与耗时，并附上 token 用量合计。"""
+        groups: dict[str, list[float]] = {}
+        usage = dict.fromkeys(_USAGE_FIELDS, 0)
+        with self._lock:
+            spans = list(self.spans)
+        for record in spans:
+            groups.setdefault(record["name"], []).append(record["ms"])
+            for field in _USAGE_FIELDS:
+                usage[field] += record.get(field, 0)
+
+        width = max((len(name) for name in groups), default=5)
+        header = (
+            f"{'phase':<{width}}  {'count':>6}  {'total ms':>10}  "
+            f"{'mean ms':>10}  {'max ms':>10}"
+        )
+        lines = [header]
+        for name, samples in groups.items():
+            total = sum(samples)
+            lines.append(
+                f"{name:<{width}}  {len(samples):>6}  {total:>10.2f}  "
+                f"{total / len(samples):>10.2f}  {max(samples):>10.2f}"
+            )
+        if usage["total_tokens"]:
+            lines.append(
+                f"Tokens: prompt {usage['prompt_tokens']}, "
+                f"completion {usage['completion_tokens']}, "
+                f"total {usage['total_tokens']}."
+            )
+        return lines
+
+    def write(self, path: str, **context: Any) -> None:
+        """以 JSON Lines 追加写入全部区段，每行附带 `context` 中的字段。"""
+        with self._lock:
+            spans = list(self.spans)
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(
+                json.dumps(context | record, ensure_ascii=False) + "\n"
+                for record in spans
+            )
+
+
+def enable(origin: float | None = None) -> Tracer:
+    """开始记录，返回新的记录器；`origin` 为计时起点（`perf_counter` 秒数），默认为当前时刻。"""
+    global _tracer
+    _tracer = Tracer(origin)
+    return _tracer
+
+
+def disable() -> None:
+    """停止记录。"""
+    global _tracer
+    _tracer = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **attrs: Any) -> AbstractContextManager[dict[str, Any]]:
+    """记录代码块耗时的上下文管理器，未启用时返回空操作。"""
+    tracer = _tracer
+    if tracer is None:
+        return nullcontext({})
+    return tracer.span(name, **attrs)
+
+
+def traced[**P, R](name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """装饰器：将每次函数调用记录为名为 `name` 的区段。"""
+
+    def decorate(fn: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def record_usage(attrs: dict[str, Any], usage: object | None) -> None:
+    """将接口响应中的 token 用量写入区段属性。"""
+    if usage is None:
+        return
+    for field in _USAGE_FIELDS:
+        value = getattr(usage, field, None)
+        if isinstance(value, int):
+            attrs[field] = value
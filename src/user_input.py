@@ -11,9 +11,17 @@ class AddArgs:
     """add 命令参数。
 
     - words: 待新增的词语列表
+    - jobs: 并发生成释义的请求数，为 None 时使用配置默认值
+    - batch_size: 每次请求合并生成的词语数，为 None 时使用配置默认值
+    - stream: 是否逐个生成并实时输出释义
+    - defer: 是否只写入词语并加入生成队列
     """
 
     words: list[str]
+    jobs: int | None = None
+    batch_size: int | None = None
+    stream: bool = False
+    defer: bool = False
 
 
 @dataclass
@@ -40,17 +48,139 @@ class GetArgs:
 
 @dataclass
 class PickArgs:
-    """pick 命令参数：随机抽取的数量。"""
+    """pick 命令参数：随机抽取的数量、可选的随机种子与是否按复习记录加权。"""
 
     count: int
+    seed: int | None = None
+    weighted: bool = False
+
+
+@dataclass
+class MarkArgs:
+    """mark 命令参数：复习的词语列表与是否答对。"""
+
+    words: list[str]
+    correct: bool
 
 
 @dataclass
 class RangeArgs:
-    """range 命令参数：基于位置区间的开始与结束（闭区间）。"""
+    """range 命令参数。
+
+    - start, end: 基于位置区间的开始与结束（闭区间），使用 `next` 时为 None
+    - next: 从上次阅读的位置继续查询的数量
+    - save: 是否将阅读位置移到 [start, end] 的末尾
+    """
+
+    start: int | None
+    end: int | None
+    next: int | None = None
+    save: bool = False
+
+
+@dataclass
+class SearchArgs:
+    """search 命令参数：检索关键词与最多返回的数量。"""
+
+    terms: list[str]
+    limit: int
+
 
-    start: int
-    end: int
+@dataclass
+class CacheArgs:
+    """cache 命令参数：是否清空缓存。"""
+
+    clear: bool
+
+
+@dataclass
+class ImportArgs:
+    """import 命令参数。
+
+    - path: 待导入的文件路径，`-` 表示标准输入
+    - fmt: 文件格式，见 `dataio.FORMATS`
+    - chunk_size: 每个事务写入的词条数，为 None 时使用配置默认值
+    - jobs: 并发生成释义的请求数，为 None 时使用配置默认值
+    - batch_size: 每次请求合并生成的词语数，为 None 时使用配置默认值
+    """
+
+    path: str
+    fmt: str
+    chunk_size: int | None = None
+    jobs: int | None = None
+    batch_size: int | None = None
+
+
+@dataclass
+class ExportArgs:
+    """export 命令参数。
+
+    - path: 导出的文件路径，`-` 表示标准输出
+    - fmt: 导出格式，见 `dataio.EXPORT_FORMATS`
+    - compress: 是否以 gzip 压缩
+    - min_id, max_id: 按 id 闭区间筛选，为 None 时不限制
+    - since: 只导出更新时间不早于该时刻（UTC，`YYYY-MM-DD HH:MM:SS`）的词条
+    """
+
+    path: str
+    fmt: str
+    compress: bool = False
+    min_id: int | None = None
+    max_id: int | None = None
+    since: str | None = None
+
+
+@dataclass
+class WorkerArgs:
+    """worker 命令参数。
+
+    - jobs: 并发生成释义的请求数，为 None 时使用配置默认值
+    - batch_size: 每次请求合并生成的词语数，为 None 时使用配置默认值
+    - watch: 队列处理完后是否继续等待新任务
+    - status: 是否只查看队列状态
+    - retry_failed: 是否让失败次数已达上限的任务重新进入队列
+    """
+
+    jobs: int | None = None
+    batch_size: int | None = None
+    watch: bool = False
+    status: bool = False
+    retry_failed: bool = False
+
+
+@dataclass
+class RegenArgs:
+    """regen 命令参数。
+
+    - min_id, max_id: 按 id 闭区间筛选，为 None 时不限制
+    - before: 只选择更新时间早于该时刻（UTC，`YYYY-MM-DD HH:MM:SS`）的词条
+    - model: 只选择由该模型生成的词条
+    - force: 是否包括已由当前模型与提示词生成的词条，为 True 时不读取响应缓存
+    - include_manual: 是否包括手动设置或导入的词条
+    - jobs: 并发生成释义的请求数，为 None 时使用配置默认值
+    - batch_size: 每次请求合并生成的词语数，为 None 时使用配置默认值
+    """
+
+    min_id: int | None = None
+    max_id: int | None = None
+    before: str | None = None
+    model: str | None = None
+    force: bool = False
+    include_manual: bool = False
+    jobs: int | None = None
+    batch_size: int | None = None
+
+
+@dataclass
+class SyncArgs:
+    """sync 命令参数。
+
+    - source: 同步的词库文件路径
+    - target: 另一个词库文件路径，为 None 时使用本地词库
+    """
+
+    source: str
+    target: str | None = None
 
 
 class UserInput:
@@ -59,7 +189,13 @@ class UserInput:
     def __init__(self, op: str, kwargs: dict[str, object]) -> None:
         match op:
             case "add":
-                self.add = AddArgs(kwargs.get("words"))
+                self.add = AddArgs(
+                    kwargs.get("words"),
+                    kwargs.get("jobs"),
+                    kwargs.get("batch_size"),
+                    kwargs.get("stream"),
+                    kwargs.get("defer"),
+                )
             case "del":
                 self.delete = DelArgs(kwargs.get("words"))
             case "set":
@@ -67,11 +203,67 @@ class UserInput:
             case "get":
                 self.get = GetArgs(kwargs.get("words"))
             case "pick":
-                self.pick = PickArgs(kwargs.get("n"))
+                self.pick = PickArgs(
+                    kwargs.get("n"), kwargs.get("seed"), kwargs.get("weighted")
+                )
+            case "mark":
+                self.mark = MarkArgs(
+                    kwargs.get("words"), kwargs.get("result") == "right"
+                )
             case "range":
-                start, end = (
-                    min(kwargs.get("n1"), kwargs.get("n2")),
-                    max(kwargs.get("n1"), kwargs.get("n2")),
+                if kwargs.get("next") is not None:
+                    self.range = RangeArgs(None, None, kwargs.get("next"))
+                else:
+                    start, end = (
+                        min(kwargs.get("n1"), kwargs.get("n2")),
+                        max(kwargs.get("n1"), kwargs.get("n2")),
+                    )
+                    self.range = RangeArgs(start, end, save=kwargs.get("save"))
+            case "search":
+                self.search = SearchArgs(kwargs.get("terms"), kwargs.get("limit"))
+            case "cache":
+                self.cache = CacheArgs(kwargs.get("clear"))
+            case "worker":
+                self.worker = WorkerArgs(
+                    kwargs.get("jobs"),
+                    kwargs.get("batch_size"),
+                    kwargs.get("watch"),
+                    kwargs.get("status"),
+                    kwargs.get("retry_failed"),
+                )
+            case "regen":
+                self.regen = RegenArgs(
+                    kwargs.get("min_id"),
+                    kwargs.get("max_id"),
+                    kwargs.get("before"),
+                    kwargs.get("model"),
+                    kwargs.get("force"),
+                    kwargs.get("include_manual"),
+                    kwargs.get("jobs"),
+                    kwargs.get("batch_size"),
+                )
+            case "sync":
+                self.sync = SyncArgs(kwargs.get("source"), kwargs.get("target"))
+            case "import":
+                self.import_ = ImportArgs(
+                    kwargs.get("path"),
+                    kwargs.get("format"),
+                    kwargs.get("chunk_size"),
+                    kwargs.get("jobs"),
+                    kwargs.get("batch_size"),
+                )
+            case "export":
+                path = kwargs.get("output_path")
+                self.export = ExportArgs(
+                    path,
+                    kwargs.get("format"),
+                    bool(kwargs.get("gzip")) or path.endswith(".gz"),
+                    kwargs.get("min_id"),
+                    kwargs.get("max_id"),
+                    kwargs.get("since"),
                 )
-                self.range = RangeArgs(start, end)
         self.op = op
+        # 查询类命令的输出格式
+        self.output: str = kwargs.get("output") or "table"
+        # 是否在结束时输出耗时汇总
+        self.profile = bool(kwargs.get("profile"))
@@ -0,0 +1,24 @@
+"""测试公用的夹具：数据库与配置均位于临时目录。"""
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from db import DictDataBase
+from settings import Settings
+
+
+@pytest.fixture
+def settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Settings:
+    monkeypatch.setenv("APPDATA", str(tmp_path))
+    return Settings()
+
+
+@pytest.fixture
+def db(tmp_path: Path) -> Iterator[DictDataBase]:
+    database = DictDataBase(str(tmp_path / "test.db"), {"journal_mode": "wal"})
+    try:
+        yield database
+    finally:
+        database.close()
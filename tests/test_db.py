@@ -0,0 +1,153 @@
+"""数据库层：位置索引、均匀与加权抽样、别名表。"""
+
+import random
+
+import pytest
+
+from db import _BLOCK_SIZE, DictDataBase, _alias_table
+
+
+def _fill(db: DictDataBase, count: int) -> list[int]:
+    db.insert_words([(f"w{i}", f"m{i}") for i in range(count)])
+    return [row[0] for row in db.conn.execute("SELECT id FROM words ORDER BY id")]
+
+
+def _live_ids(db: DictDataBase) -> list[int]:
+    return [row[0] for row in db.conn.execute("SELECT id FROM words ORDER BY id")]
+
+
+def test_insert_words_counts_only_new_rows(db: DictDataBase) -> None:
+    # 触发器写入的行（位置索引、修改日志）不计入
+    assert db.insert_words([("a", "1"), ("b", "2")]) == 2
+    assert db.insert_words([("a", "x"), ("c", "3")]) == 1
+
+
+def test_locate_follows_deletes_across_blocks(db: DictDataBase) -> None:
+    _fill(db, _BLOCK_SIZE * 3)
+    for i in [*range(10, 500), *range(_BLOCK_SIZE + 3, _BLOCK_SIZE + 40)]:
+        db.delete_word(f"w{i}")
+    live = _live_ids(db)
+
+    for position in (1, 10, 11, 600, _BLOCK_SIZE, len(live)):
+        block_start, offset = db._locate(position)
+        row = db.conn.execute(
+            "SELECT id FROM words WHERE id >= ? ORDER BY id LIMIT 1 OFFSET ?",
+            (block_start, offset),
+        ).fetchone()
+        assert row[0] == live[position - 1]
+    assert db._locate(len(live) + 1) is None
+
+
+def test_iter_range_matches_positions(db: DictDataBase) -> None:
+    _fill(db, _BLOCK_SIZE * 2 + 5)
+    db.delete_word("w3")
+    live = _live_ids(db)
+
+    rows = list(db.iter_range(_BLOCK_SIZE - 2, _BLOCK_SIZE + 3, batch_size=2))
+    assert [row[0] for row in rows] == live[_BLOCK_SIZE - 3 : _BLOCK_SIZE + 3]
+    assert [row[0] for row in db.iter_range(len(live) - 1, len(live) + 10)] == live[-2:]
+    assert list(db.iter_range(len(live) + 1, len(live) + 5)) == []
+
+
+def test_iter_after_continues_from_id(db: DictDataBase) -> None:
+    _fill(db, 50)
+    live = _live_ids(db)
+    assert [row[0] for row in db.iter_after(live[9], 5, batch_size=2)] == live[10:15]
+
+
+@pytest.mark.parametrize("deleted", [0, 900])
+def test_sample_ids_are_unique_live_ids(db: DictDataBase, deleted: int) -> None:
+    """稠密时走拒绝采样，删除大部分词条后 id 稀疏，走位置索引。"""
+    _fill(db, 1000)
+    for i in range(deleted):
+        db.delete_word(f"w{i}")
+    live = set(_live_ids(db))
+    rng = random.Random(1)
+
+    for count in (1, 7, len(live) // 2, len(live), len(live) + 5):
+        ids = db._sample_ids(count, rng)
+        assert len(ids) == min(count, len(live))
+        assert len(set(ids)) == len(ids)
+        assert set(ids) <= live
+
+
+def test_sample_ids_is_uniform(db: DictDataBase) -> None:
+    _fill(db, 20)
+    rng = random.Random(2)
+    counts: dict[int, int] = {}
+    for _ in range(4000):
+        (id_,) = db._sample_ids(1, rng)
+        counts[id_] = counts.get(id_, 0) + 1
+    assert len(counts) == 20
+    assert max(counts.values()) < 2 * min(counts.values())
+
+
+def test_alias_table_reproduces_weights() -> None:
+    weights = [0.5, 3.0, 1.0, 7.5, 2.0]
+    table = _alias_table(weights)
+    n = len(weights)
+    mass = [0.0] * n
+    for i, (prob, alias) in enumerate(table):
+        mass[i] += prob / n
+        mass[alias] += (1 - prob) / n
+    for m, w in zip(mass, weights, strict=True):
+        assert m == pytest.approx(w / sum(weights))
+
+
+def _weight(db: DictDataBase, word: str) -> float:
+    return db.conn.execute(
+        "SELECT r.weight FROM reviews r JOIN words w ON w.id = r.word_id "
+        "WHERE w.word = ?",
+        (word,),
+    ).fetchone()[0]
+
+
+def _pick_rate(db: DictDataBase, word: str, rounds: int, seed: int) -> float:
+    target = db.conn.execute("SELECT id FROM words WHERE word = ?", (word,)).fetchone()
+    rng = random.Random(seed)
+    hits = sum(db._sample_weighted_ids(1, rng) == [target[0]] for _ in range(rounds))
+    return hits / rounds
+
+
+def test_weighted_sampling_follows_review_weights(db: DictDataBase) -> None:
+    _fill(db, 40)
+    for _ in range(3):
+        db.record_reviews(["w0"], correct=False)
+    for _ in range(4):
+        db.record_reviews(["w1"], correct=True)
+    heavy, light = _weight(db, "w0"), _weight(db, "w1")
+    assert heavy > 1 > light
+    total = 38 + heavy + light
+
+    assert _pick_rate(db, "w0", 4000, 3) == pytest.approx(heavy / total, abs=0.03)
+    assert _pick_rate(db, "w1", 4000, 4) == pytest.approx(light / total, abs=0.01)
+
+
+def test_weighted_sampling_is_unique_and_read_only(db: DictDataBase) -> None:
+    _fill(db, 100)
+    db.record_reviews(["w5", "w6"], correct=False)
+    before = db.conn.total_changes
+    for count in (3, 50, 60, 200):
+        ids = db._sample_weighted_ids(count, random.Random(count))
+        assert len(ids) == min(count, 100)
+        assert len(set(ids)) == len(ids)
+    assert len(db.query_random(10, random.Random(5), weighted=True)) == 10
+    assert db.conn.total_changes == before
+
+
+def test_stale_alias_table_is_rebuilt_in_memory(db: DictDataBase) -> None:
+    _fill(db, 100)
+    db.record_reviews(["w1", "w2"], correct=False)
+    size, _, table = db._review_alias()
+    assert size == 2 and table is None
+
+    # 删除词条后复习记录随之删除，存储的别名表过期
+    db.delete_word("w2")
+    stored = {row[0] for row in db.conn.execute("SELECT word_id FROM review_alias")}
+    size, _, table = db._review_alias()
+    assert size == 1 and table is not None
+    live = set(_live_ids(db))
+    rng = random.Random(6)
+    for _ in range(200):
+        assert set(db._sample_weighted_ids(5, rng)) <= live
+    assert stored - live
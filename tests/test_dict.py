@@ -0,0 +1,44 @@
+"""释义清洗：流式输出与整体清洗的结果一致。"""
+
+import pytest
+
+from dict import _clean_meaning, _MeaningCleaner
+
+_CONTENTS = [
+    "释义：形容人见识短浅。",
+    "  定义:比喻目光短浅  \n",
+    "释义：\n  多义词，第一义。\n第二义  ",
+    "无提示词的释义",
+    "释",
+    "",
+    "  \n ",
+]
+
+
+def _stream(chunks: list[str]) -> str:
+    cleaner = _MeaningCleaner()
+    out = [cleaner.feed(chunk) for chunk in chunks]
+    out.append(cleaner.finish())
+    return "".join(out)
+
+
+@pytest.mark.parametrize("content", _CONTENTS)
+def test_cleaner_matches_clean_meaning_at_every_split(content: str) -> None:
+    expected = _clean_meaning(content)
+    assert _stream([content]) == expected
+    for i in range(len(content) + 1):
+        assert _stream([content[:i], content[i:]]) == expected
+
+
+@pytest.mark.parametrize("content", _CONTENTS)
+def test_cleaner_matches_clean_meaning_char_by_char(content: str) -> None:
+    assert _stream(list(content)) == _clean_meaning(content)
+
+
+def test_cleaner_outputs_before_finish() -> None:
+    cleaner = _MeaningCleaner()
+    assert cleaner.feed("释义：") == ""
+    assert cleaner.feed("目光短浅，见识不广") == "目光短浅，见识不广"
+    assert cleaner.feed("  ") == ""
+    assert cleaner.feed("的人") == "  的人"
+    assert cleaner.finish() == "。"
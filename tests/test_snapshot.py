@@ -0,0 +1,90 @@
+"""只读快照：文件格式、查询结果与数据库一致，以及过期判断。"""
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+import snapshot
+from dict import Dict
+from settings import Settings
+from snapshot import Snapshot
+
+_WORDS = [("杞人忧天", "比喻不必要的忧虑。"), ("a", "x"), ("b", ""), ("中", "中间。")]
+
+
+@pytest.fixture
+def dictionary(settings: Settings) -> Iterator[Dict]:
+    d = Dict(settings)
+    d.db.insert_words(_WORDS)
+    d.db.delete_word("a")
+    d.db.insert_words([("a", "y"), ("zz", "最后。")])
+    yield d
+    d.close_db()
+
+
+def _db_rows(d: Dict) -> list[tuple[int, str, str]]:
+    return list(d.db.iter_id_words())
+
+
+def test_compiled_snapshot_matches_database(dictionary: Dict) -> None:
+    assert dictionary.compile_snapshot() == 5
+    snap = Snapshot.open(dictionary.settings.snapshot_path)
+    assert snap is not None
+    try:
+        rows = _db_rows(dictionary)
+        assert snap.count == len(rows)
+        assert list(snap.range(1, snap.count)) == rows
+        assert list(snap.range(2, 3)) == rows[1:3]
+        assert list(snap.range(0, 100)) == rows
+        assert list(snap.after(rows[1][0], 2)) == rows[2:4]
+        assert list(snap.after(0, 100)) == rows
+        assert list(snap.after(rows[-1][0], 5)) == []
+        for _, word, meaning in rows:
+            assert snap.lookup(word) == meaning
+        assert snap.lookup("不存在") is None
+        assert snap.lookup("") is None
+    finally:
+        snap.close()
+
+
+def test_open_rejects_malformed_files(tmp_path: Path, dictionary: Dict) -> None:
+    dictionary.compile_snapshot()
+    data = Path(dictionary.settings.snapshot_path).read_bytes()
+
+    assert Snapshot.open(str(tmp_path / "missing.snap")) is None
+    for broken in (b"", data[:-1], data + b"\0", b"XXXX" + data[4:]):
+        path = tmp_path / "broken.snap"
+        path.write_bytes(broken)
+        assert Snapshot.open(str(path)) is None
+
+
+def test_snapshot_is_used_until_the_database_changes(dictionary: Dict) -> None:
+    dictionary.compile_snapshot()
+    snap = dictionary._get_snapshot()
+    assert snap is not None and snap.lookup("中") == "中间。"
+
+    dictionary.db.update_word("中", "居中。")
+    assert dictionary._get_snapshot() is None
+
+    dictionary.compile_snapshot()
+    snap = dictionary._get_snapshot()
+    assert snap is not None and snap.lookup("中") == "居中。"
+
+
+def test_unchanged_database_restamps_the_snapshot(dictionary: Dict) -> None:
+    """数据库文件状态变化但词表未变时复核通过，并更新快照记录的文件状态。"""
+    dictionary.compile_snapshot()
+    settings = dictionary.settings
+    # 写入词表之外的数据，数据库文件状态变化
+    dictionary.db.database_id()
+    current = snapshot.fingerprint(settings.db_path)
+
+    snap = dictionary._get_snapshot()
+    assert snap is not None and snap.fingerprint == current
+    reopened = Snapshot.open(settings.snapshot_path)
+    assert reopened is not None
+    try:
+        assert reopened.fingerprint == current
+    finally:
+        reopened.close()
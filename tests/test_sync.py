@@ -0,0 +1,185 @@
+"""双向同步：冲突时较新的一方胜出，两端最终一致。"""
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from db import DictDataBase
+from dict import Dict
+from settings import Settings
+
+_OLD = "2024-01-01 00:00:00"
+_NEW = "2024-06-01 00:00:00"
+
+
+@pytest.fixture
+def dictionary(settings: Settings) -> Iterator[Dict]:
+    d = Dict(settings)
+    yield d
+    d.close_db()
+
+
+@pytest.fixture
+def paths(tmp_path: Path) -> list[str]:
+    paths = [str(tmp_path / f"{name}.db") for name in "abc"]
+    for path in paths:
+        DictDataBase(path).close()
+    return paths
+
+
+def _write(path: str, word: str, meaning: str, updated_at: str) -> None:
+    db = DictDataBase(path)
+    try:
+        with db.conn:
+            db.conn.execute(
+                """
+                INSERT INTO words(word, meaning, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(word) DO UPDATE SET
+                  meaning = excluded.meaning, updated_at = excluded.updated_at
+                """,
+                (word, meaning, updated_at),
+            )
+    finally:
+        db.close()
+
+
+def _delete(path: str, word: str, deleted_at: str) -> None:
+    db = DictDataBase(path)
+    try:
+        db.delete_word(word)
+        with db.conn:
+            db.conn.execute(
+                "UPDATE tombstones SET deleted_at = ? WHERE word = ?",
+                (deleted_at, word),
+            )
+    finally:
+        db.close()
+
+
+def _words(path: str) -> dict[str, str]:
+    db = DictDataBase(path)
+    try:
+        return {
+            row[0]: row[1] for row in db.conn.execute("SELECT word, meaning FROM words")
+        }
+    finally:
+        db.close()
+
+
+def test_sync_copies_both_ways(dictionary: Dict, paths: list[str]) -> None:
+    a, b, _ = paths
+    _write(a, "甲", "来自 a。", _OLD)
+    _write(b, "乙", "来自 b。", _OLD)
+
+    results = dictionary.sync(a, b)
+    assert [r[2:] for r in results] == [(1, 0), (1, 0)]
+    assert _words(a) == _words(b) == {"甲": "来自 a。", "乙": "来自 b。"}
+    # 没有新的修改时不再写入
+    assert [r[2:] for r in dictionary.sync(a, b)] == [(0, 0), (0, 0)]
+
+
+@pytest.mark.parametrize("newer", ["a", "b"])
+def test_newer_update_wins(dictionary: Dict, paths: list[str], newer: str) -> None:
+    a, b, _ = paths
+    _write(a, "词", "a 的词义。", _NEW if newer == "a" else _OLD)
+    _write(b, "词", "b 的词义。", _NEW if newer == "b" else _OLD)
+
+    dictionary.sync(a, b)
+    expected = f"{newer} 的词义。"
+    assert _words(a) == _words(b) == {"词": expected}
+
+
+def test_tie_is_broken_by_meaning(dictionary: Dict, paths: list[str]) -> None:
+    a, b, _ = paths
+    _write(a, "词", "甲。", _OLD)
+    _write(b, "词", "乙。", _OLD)
+
+    dictionary.sync(a, b)
+    assert _words(a) == _words(b) == {"词": max("甲。", "乙。")}
+
+
+def test_pending_meaning_never_overwrites(dictionary: Dict, paths: list[str]) -> None:
+    a, b, _ = paths
+    # 词义为空表示尚待生成，即使更新时间较新也不覆盖已有词义，也不同步给对端
+    _write(a, "词", "", _NEW)
+    _write(b, "词", "已有词义。", _OLD)
+    _write(a, "新词", "", _NEW)
+
+    dictionary.sync(a, b)
+    assert _words(a) == {"词": "已有词义。", "新词": ""}
+    assert _words(b) == {"词": "已有词义。"}
+
+
+def test_delete_wins_over_older_update(dictionary: Dict, paths: list[str]) -> None:
+    a, b, _ = paths
+    _write(a, "词", "旧词义。", _OLD)
+    dictionary.sync(a, b)
+    _delete(a, "词", _NEW)
+
+    dictionary.sync(a, b)
+    assert _words(a) == _words(b) == {}
+
+
+def test_newer_update_wins_over_delete(dictionary: Dict, paths: list[str]) -> None:
+    a, b, _ = paths
+    _write(a, "词", "旧词义。", _OLD)
+    dictionary.sync(a, b)
+    _delete(a, "词", "2024-03-01 00:00:00")
+    _write(b, "词", "新词义。", _NEW)
+
+    dictionary.sync(a, b)
+    assert _words(a) == _words(b) == {"词": "新词义。"}
+
+
+def test_readded_word_syncs_after_delete(dictionary: Dict, paths: list[str]) -> None:
+    a, b, _ = paths
+    _write(a, "词", "旧词义。", _OLD)
+    dictionary.sync(a, b)
+    _delete(a, "词", _NEW)
+    dictionary.sync(a, b)
+    assert _words(b) == {}
+
+    # 批量导入（INSERT OR IGNORE）重新加入的词语也记为新的修改
+    db = DictDataBase(a)
+    try:
+        db.insert_words([("词", "新词义。")])
+    finally:
+        db.close()
+
+    dictionary.sync(a, b)
+    assert _words(a) == _words(b) == {"词": "新词义。"}
+
+
+def test_delete_reaches_databases_without_the_word(
+    dictionary: Dict, paths: list[str]
+) -> None:
+    """删除记录经由没有该词语的数据库继续传递，且不会被旧的词条复活。"""
+    a, b, c = paths
+    _write(a, "词", "旧词义。", _OLD)
+    dictionary.sync(a, c)
+    _delete(a, "词", _NEW)
+
+    dictionary.sync(a, b)
+    dictionary.sync(b, c)
+    dictionary.sync(a, c)
+    assert _words(a) == _words(b) == _words(c) == {}
+
+
+def test_relay_through_third_database_converges(
+    dictionary: Dict, paths: list[str]
+) -> None:
+    a, b, c = paths
+    _write(a, "甲", "a 旧。", _OLD)
+    _write(b, "甲", "b 新。", _NEW)
+    _write(c, "丙", "c。", _OLD)
+
+    for x, y in [(a, c), (b, c), (a, c), (a, b)]:
+        dictionary.sync(x, y)
+    assert _words(a) == _words(b) == _words(c) == {"甲": "b 新。", "丙": "c。"}
+
+
+def test_sync_with_itself_is_rejected(dictionary: Dict, paths: list[str]) -> None:
+    a = paths[0]
+    with pytest.raises(Exception, match="itself"):
+        dictionary.sync(a, a)